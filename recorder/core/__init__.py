@@ -3,13 +3,29 @@
 包含图像处理、录制会话等核心功能
 """
 
-from .image_processor import ImageProcessor
-from .recording_session import RecordingSession, MultiStageSession
-from .multistage_manager import MultiStageManager
-
-__all__ = [
-    'ImageProcessor',
-    'RecordingSession',
-    'MultiStageSession',
-    'MultiStageManager'
-]
+import importlib
+
+# 按需导入，使用ImageProcessor时无需加载PyQt5
+_lazy_imports = {
+    'ImageProcessor': '.image_processor',
+    'RecordingSession': '.recording_session',
+    'MultiStageSession': '.recording_session',
+    'MultiStageManager': '.multistage_manager',
+    'ImageProcessingWorker': '.image_worker',
+    'SessionPackager': '.session_packager',
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    module_path = _lazy_imports.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
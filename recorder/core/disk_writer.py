@@ -0,0 +1,154 @@
+"""
+磁盘写入模块
+在后台线程中完成JPEG编码和文件写入，录制路径只负责入队
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+
+import cv2
+
+# 可选：PyTurboJPEG（libjpeg-turbo）编码更快，不可用时回退到cv2.imencode
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420
+    _turbo_jpeg = TurboJPEG()
+except Exception:  # 未安装PyTurboJPEG或找不到libturbojpeg动态库
+    _turbo_jpeg = None
+
+
+# 直接用os.open/os.write写文件，绕过Python文件对象；Windows下需要O_BINARY避免换行转换
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+def jpeg_params(quality):
+    """JPEG编码参数：关闭优化和渐进式编码，避免额外的编码遍历"""
+    return [int(cv2.IMWRITE_JPEG_QUALITY), int(quality),
+            int(cv2.IMWRITE_JPEG_OPTIMIZE), 0,
+            int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0]
+
+
+class DiskWriter:
+    """
+    后台磁盘写入器
+    从队列中取出 (路径, 图像, 质量) 并编码保存，队列满时丢弃新帧
+    cv2.imencode会释放GIL，多个写入线程可以并行编码
+    """
+    
+    def __init__(self, max_pending=32, workers=2):
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        
+        # 统计信息
+        self._stats_lock = threading.Lock()
+        self.written_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+        self.written_files = []  # 已写入文件 (路径, 字节数, 写入时间)，供报告使用，无需再stat
+        
+        self._threads = [
+            threading.Thread(target=self._run, name=f"DiskWriter-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def submit(self, filepath, image, quality, on_done=None):
+        """
+        提交一张图像等待写入
+        
+        Args:
+            filepath: 目标文件路径
+            image: 图像数据（调用方需保证入队后不再修改）
+            quality: JPEG质量
+            on_done: 可选回调，图像写入（或失败）后在写入线程中调用，用于归还缓冲区
+        
+        Returns:
+            是否成功入队（未入队时不会调用on_done）
+        """
+        if self._closed:
+            self.logger.warning("写入器已关闭，无法保存图像")
+            return False
+        
+        try:
+            self._queue.put_nowait((filepath, image, quality, on_done))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped_count += 1
+            self.logger.warning(f"写入队列已满，丢弃图像: {filepath}")
+            return False
+    
+    def flush(self):
+        """等待队列中的图像全部写入磁盘"""
+        self._queue.join()
+    
+    def close(self):
+        """写完剩余图像并结束写入线程"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+    
+    def _run(self):
+        """写入线程主循环"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                filepath, image, quality, on_done = item
+                self._write(filepath, image, quality)
+                if on_done is not None:
+                    on_done()
+            finally:
+                self._queue.task_done()
+    
+    def _write(self, filepath, image, quality):
+        """编码并写入单张图像"""
+        try:
+            data = self._encode(image, quality)
+            if data is None:
+                self._count_failure()
+                self.logger.error(f"图像编码失败: {filepath}")
+                return
+            
+            # 编码后用文件描述符写入（支持中文路径），不创建Python文件对象
+            fd = os.open(filepath, _WRITE_FLAGS, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+            
+            with self._stats_lock:
+                self.written_count += 1
+                self.written_files.append((filepath, len(data), time.time()))
+            # 每帧调用：默认INFO级别下不输出，使用惰性格式化，日志级别关闭时不拼接字符串
+            self.logger.debug("图像保存成功: %s, 大小: %d 字节", filepath, len(data))
+        
+        except Exception as e:
+            self._count_failure()
+            self.logger.error(f"写入图像失败: {filepath}, {e}")
+    
+    @staticmethod
+    def _encode(image, quality):
+        """将BGR图像编码为JPEG字节，失败返回None"""
+        if _turbo_jpeg is not None:
+            return _turbo_jpeg.encode(image, quality=int(quality), pixel_format=TJPF_BGR,
+                                      jpeg_subsample=TJSAMP_420)
+        
+        result, encimg = cv2.imencode('.jpg', image, jpeg_params(quality))
+        return encimg.tobytes() if result else None
+    
+    def _count_failure(self):
+        """记录一次写入失败"""
+        with self._stats_lock:
+            self.failed_count += 1
@@ -4,46 +4,129 @@
 修复了ROI坐标转换和旋转处理问题
 """
 
+import functools
+import logging
+
 import cv2
 import numpy as np
 
 
+_logger = logging.getLogger(__name__)
+
+# 90°整数倍旋转直接做像素重排，无需插值
+# （getRotationMatrix2D 中正角度为逆时针）
+_RIGHT_ANGLE_ROTATIONS = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+}
+
+
+def _clamp_roi(x, y, w, h, img_width, img_height):
+    """将ROI限制在图像范围内（每帧调用，使用条件表达式代替min/max调用）"""
+    x = 0 if x < 0 else (img_width - 1 if x >= img_width else x)
+    y = 0 if y < 0 else (img_height - 1 if y >= img_height else y)
+    w = w if w < img_width - x else img_width - x
+    h = h if h < img_height - y else img_height - y
+    return x, y, w, h
+
+
 class ImageProcessor:
     """
     图像处理器
     负责各种图像处理操作
     """
     
+    # 是否使用OpenCL（T-API）加速，None表示尚未检测
+    _use_opencl = None
+    
     @staticmethod
-    def rotate_image(image, angle):
-        """
-        平滑旋转图像 - 避免边缘撕裂
+    def opencl_enabled():
+        """检测并返回是否启用OpenCL加速（首次调用时检测，遵循cv2.ocl.setUseOpenCL的设置）"""
+        if ImageProcessor._use_opencl is None:
+            try:
+                ImageProcessor._use_opencl = cv2.ocl.useOpenCL()
+            except Exception:
+                ImageProcessor._use_opencl = False
+        return ImageProcessor._use_opencl
+    
+    @staticmethod
+    def set_opencl_enabled(enabled):
+        """手动开启/关闭OpenCL加速（设备不支持时保持关闭）"""
+        cv2.ocl.setUseOpenCL(bool(enabled))
+        ImageProcessor._use_opencl = cv2.ocl.useOpenCL()
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def get_rotation_matrix(width, height, angle):
         """
-        if angle == 0:
-            return image
-            
-        height, width = image.shape[:2]
+        计算旋转矩阵及扩展后的画布尺寸（保证旋转后内容不被裁切）
+        录制过程中尺寸和角度基本不变，按 (width, height, angle) 缓存；
+        返回的矩阵为只读，需要修改时请先 copy()
         
-       
-        center = (width // 2, height // 2)
+        Returns:
+            (rotation_matrix, new_width, new_height)
+        """
+        # 以像素中心为旋转中心，90°整数倍时与cv2.rotate逐像素一致
+        center = ((width - 1) / 2, (height - 1) / 2)
         rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
         
         cos = np.abs(rotation_matrix[0, 0])
         sin = np.abs(rotation_matrix[0, 1])
-        new_width = int((height * sin) + (width * cos))
-        new_height = int((height * cos) + (width * sin))
+        new_width = int(round((height * sin) + (width * cos), 6))
+        new_height = int(round((height * cos) + (width * sin), 6))
         
-        rotation_matrix[0, 2] += (new_width / 2) - center[0]
-        rotation_matrix[1, 2] += (new_height / 2) - center[1]
+        rotation_matrix[0, 2] += (new_width - 1) / 2 - center[0]
+        rotation_matrix[1, 2] += (new_height - 1) / 2 - center[1]
+        rotation_matrix.setflags(write=False)
         
-        return cv2.warpAffine(
-            image, 
+        return rotation_matrix, new_width, new_height
+    
+    @staticmethod
+    def rotate_image(image, angle, dst=None, scale=1.0):
+        """
+        平滑旋转图像 - 避免边缘撕裂
+        
+        Args:
+            image: 输入图像
+            angle: 旋转角度
+            dst: 可选的输出缓冲区，尺寸匹配时直接写入，不匹配时OpenCV会重新分配；
+                 调用方应保存返回值供下一帧复用（提供缓冲区时始终在CPU上处理）
+            scale: 输出缩放比例，任意角度旋转时与旋转合并为一次warpAffine
+                   （90°整数倍为像素重排，忽略该参数）
+        """
+        if angle % 360 == 0:
+            return image
+        
+        rotate_code = _RIGHT_ANGLE_ROTATIONS.get(angle % 360)
+        if rotate_code is not None:
+            return cv2.rotate(image, rotate_code, dst=dst)
+            
+        height, width = image.shape[:2]
+        rotation_matrix, new_width, new_height = ImageProcessor.get_rotation_matrix(
+            width, height, angle
+        )
+        
+        if scale != 1.0:
+            rotation_matrix = rotation_matrix * scale
+            # 与cv2.resize的像素中心对齐方式保持一致
+            rotation_matrix[:, 2] += 0.5 * scale - 0.5
+            new_width = max(1, int(new_width * scale))
+            new_height = max(1, int(new_height * scale))
+        
+        # 未提供输出缓冲区且启用OpenCL时整帧旋转在GPU上完成，只在返回时取回内存；
+        # 提供缓冲区时留在CPU直接写入：单帧上传/取回的开销通常超过GPU节省的时间
+        use_opencl = dst is None and ImageProcessor.opencl_enabled()
+        rotated = cv2.warpAffine(
+            cv2.UMat(image) if use_opencl else image, 
             rotation_matrix, 
             (new_width, new_height),
-            flags=cv2.INTER_CUBIC,
+            dst=None if use_opencl else dst,
+            flags=cv2.INTER_LINEAR,
             borderMode=cv2.BORDER_CONSTANT,
             borderValue=(0, 0, 0)
         )
+        return rotated.get() if use_opencl else rotated
     
     @staticmethod
     def extract_roi(image, roi_rect):
@@ -62,113 +145,223 @@ class ImageProcessor:
             
         x, y, w, h = roi_rect
         
-        # 确保ROI坐标在图像范围内
+        # 先把ROI的起止坐标限制在图像范围内再切片，与图像无交集时返回原图
         height, width = image.shape[:2]
-        x = max(0, min(x, width - 1))
-        y = max(0, min(y, height - 1))
-        w = min(w, width - x)
-        h = min(h, height - y)
+        x0 = x if x > 0 else 0
+        y0 = y if y > 0 else 0
+        x1 = x + w if x + w < width else width
+        y1 = y + h if y + h < height else height
         
-        if w <= 0 or h <= 0:
-            return image
-            
-        return image[y:y+h, x:x+w]
+        return image[y0:y1, x0:x1] if x1 > x0 and y1 > y0 else image
     
     @staticmethod
-    def resize_to_target(image, target_size=(240, 240)):
+    def resize_to_target(image, target_size=(240, 240), dst=None):
         """
         调整图像尺寸到目标尺寸
         
         Args:
             image: 输入图像
             target_size: 目标尺寸 (width, height)
+            dst: 可选的输出缓冲区，尺寸匹配时直接写入，避免每帧分配
             
         Returns:
             调整尺寸后的图像
         """
-        return cv2.resize(image, target_size, interpolation=cv2.INTER_AREA)
+        # 缩小2倍以上用INTER_AREA抗锯齿，其余（轻度缩小或放大）用更便宜的INTER_LINEAR
+        height, width = image.shape[:2]
+        scale = max(width / target_size[0], height / target_size[1])
+        interpolation = cv2.INTER_AREA if scale >= 2.0 else cv2.INTER_LINEAR
+        return cv2.resize(image, target_size, dst=dst, interpolation=interpolation)
+    
+    @staticmethod
+    def create_output_buffer(target_size=(240, 240)):
+        """创建可在多帧间复用的输出缓冲区（配合各处理函数的dst参数）"""
+        target_w, target_h = target_size
+        return np.empty((target_h, target_w, 3), dtype=np.uint8)
     
     @staticmethod
     def process_image_pipeline(image, rotation_angle=0, roi_coords=None, 
-                            target_size=(240, 240), scale_factor=1.0):
+                            target_size=(240, 240), scale_factor=1.0, dst=None):
         """
         图像处理流水线 - 修复处理顺序版本
         处理顺序：旋转 → ROI提取 → 尺寸调整（与预览显示一致）
+        传入dst时结果写入该缓冲区，调用方需在下一帧前用完或自行复制
         """
         if image is None:
             return None
-            
-        processed_image = image.copy()
         
-        # 1. 首先应用旋转（与预览显示顺序一致）
+        # 全流程按uint8处理（WebSocket解码结果本就是uint8，此处不会复制）；
+        # 浮点图像会使warpAffine/resize的内存带宽翻倍
+        if image.dtype != np.uint8:
+            image = image.astype(np.uint8, copy=False)
+        
+        # 图像尺寸只读取一次，后续步骤都使用这里的值
+        src_height, src_width = image.shape[:2]
+        
+        # 无旋转、无ROI且已是目标尺寸（如240×240眼部摄像头）时无需任何处理
+        if rotation_angle % 360 == 0 and not roi_coords and (src_width, src_height) == tuple(target_size):
+            return image
+
+        # 不复制输入图像：旋转和缩放都会生成新数组，ROI切片只是只读视图
+        img_width, img_height = src_width, src_height
+        
+        # 1. 旋转只计算旋转后的画布尺寸，实际像素运算与缩放合并
         if rotation_angle != 0:
-            processed_image = ImageProcessor.rotate_image(processed_image, rotation_angle)
+            _, img_width, img_height = ImageProcessor.get_rotation_matrix(
+                src_width, src_height, rotation_angle
+            )
         
-        # 2. 然后在旋转后的图像上提取ROI
+        # 2. 在旋转后的坐标系中确定ROI
+        roi_x, roi_y, roi_w, roi_h = 0, 0, img_width, img_height
         if roi_coords and scale_factor > 0:
             x, y, w, h = roi_coords
             
-            # 将预览坐标转换为旋转后图像的实际坐标
-            actual_x = int(x / scale_factor)
-            actual_y = int(y / scale_factor)
-            actual_w = int(w / scale_factor)
-            actual_h = int(h / scale_factor)
-            
-            # 边界检查
-            img_height, img_width = processed_image.shape[:2]
-            actual_x = max(0, min(actual_x, img_width - 1))
-            actual_y = max(0, min(actual_y, img_height - 1))
-            actual_w = min(actual_w, img_width - actual_x)
-            actual_h = min(actual_h, img_height - actual_y)
+            # 将预览坐标转换为旋转后图像的实际坐标，并做边界检查
+            actual_x, actual_y, actual_w, actual_h = _clamp_roi(
+                int(x / scale_factor), int(y / scale_factor),
+                int(w / scale_factor), int(h / scale_factor),
+                img_width, img_height
+            )
             
-            # 提取ROI
             if actual_w > 10 and actual_h > 10:
-                processed_image = processed_image[actual_y:actual_y+actual_h, 
-                                                actual_x:actual_x+actual_w]
+                roi_x, roi_y, roi_w, roi_h = actual_x, actual_y, actual_w, actual_h
+        
+        # 3. 无旋转：直接切片后缩放
+        if rotation_angle == 0:
+            roi_image = image[roi_y:roi_y+roi_h, roi_x:roi_x+roi_w]
+            return ImageProcessor.resize_to_target(roi_image, target_size, dst=dst)
+        
+        # 3. 有旋转：旋转 → ROI平移 → 缩放 合成为一次warpAffine，省去中间大图
+        return ImageProcessor._warp_roi_to_target(
+            image, (src_width, src_height), rotation_angle,
+            (roi_x, roi_y, roi_w, roi_h), target_size, dst=dst
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _get_fused_matrix(img_width, img_height, rotation_angle, roi_rect, target_size):
+        """
+        计算 旋转 → ROI平移 → 缩放 的合成矩阵
+        录制过程中角度、ROI和输出尺寸基本不变，与get_rotation_matrix一样按参数缓存；
+        返回的矩阵为只读
+        """
+        roi_x, roi_y, roi_w, roi_h = roi_rect
+        target_w, target_h = target_size
+        rotation_matrix, _, _ = ImageProcessor.get_rotation_matrix(
+            img_width, img_height, rotation_angle
+        )
+        scale_x = target_w / roi_w
+        scale_y = target_h / roi_h
+        fused_matrix = rotation_matrix.copy()
+        fused_matrix[0, 2] -= roi_x
+        fused_matrix[1, 2] -= roi_y
+        fused_matrix[0] *= scale_x
+        fused_matrix[1] *= scale_y
+        # 与cv2.resize的像素中心对齐方式保持一致
+        fused_matrix[0, 2] += 0.5 * scale_x - 0.5
+        fused_matrix[1, 2] += 0.5 * scale_y - 0.5
+        fused_matrix.setflags(write=False)
+        
+        return fused_matrix
+    
+    @staticmethod
+    def _warp_roi_to_target(image, image_size, rotation_angle, roi_rect, target_size, dst=None):
+        """
+        将旋转、ROI平移和缩放合成为一个仿射矩阵，只计算目标尺寸的输出像素
+        
+        Args:
+            image: 原始（未旋转）图像
+            image_size: 原始图像尺寸 (width, height)，由调用方传入避免重复读取shape
+            rotation_angle: 旋转角度
+            roi_rect: 旋转后坐标系中的ROI (x, y, w, h)
+            target_size: 目标尺寸 (width, height)
+            dst: 可选的输出缓冲区
+        """
+        img_width, img_height = image_size
+        roi_x, roi_y, roi_w, roi_h = roi_rect
+        target_w, target_h = target_size
         
-        # 3. 最后调整到目标尺寸
-        processed_image = ImageProcessor.resize_to_target(processed_image, target_size)
+        # 90°整数倍：先在原图上切出ROI并缩放，再对小图做像素重排，无需旋转插值
+        rotate_code = _RIGHT_ANGLE_ROTATIONS.get(rotation_angle % 360)
+        if rotate_code is not None:
+            if rotate_code == cv2.ROTATE_180:
+                src_roi = image[img_height-roi_y-roi_h:img_height-roi_y,
+                                img_width-roi_x-roi_w:img_width-roi_x]
+                resized = ImageProcessor.resize_to_target(src_roi, (target_w, target_h))
+            elif rotate_code == cv2.ROTATE_90_COUNTERCLOCKWISE:
+                src_roi = image[roi_x:roi_x+roi_w, img_width-roi_y-roi_h:img_width-roi_y]
+                resized = ImageProcessor.resize_to_target(src_roi, (target_h, target_w))
+            else:
+                src_roi = image[img_height-roi_x-roi_w:img_height-roi_x, roi_y:roi_y+roi_h]
+                resized = ImageProcessor.resize_to_target(src_roi, (target_h, target_w))
+            return cv2.rotate(resized, rotate_code, dst=dst)
+        
+        fused_matrix = ImageProcessor._get_fused_matrix(
+            img_width, img_height, rotation_angle, tuple(roi_rect), (target_w, target_h)
+        )
         
-        return processed_image
+        return cv2.warpAffine(
+            image,
+            fused_matrix,
+            (target_w, target_h),
+            dst=dst,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+            borderValue=(0, 0, 0)
+        )
     
     @staticmethod
     def process_image_pipeline_wysiwyg(image, rotation_angle=0, roi_coords=None, 
-                                      target_size=(240, 240), preview_size=None):
+                                      target_size=(240, 240), preview_size=None, dst=None):
         """
         所见即所得的图像处理流水线
         直接基于预览显示的图像进行处理，确保ROI完全一致
+        传入dst时结果写入该缓冲区，调用方需在下一帧前用完或自行复制
         """
         if image is None:
             return None
         
-        import logging
-        logger = logging.getLogger(__name__)
+        # 全流程按uint8处理（WebSocket解码结果本就是uint8，此处不会复制）；
+        # 浮点图像会使warpAffine/resize的内存带宽翻倍
+        if image.dtype != np.uint8:
+            image = image.astype(np.uint8, copy=False)
+        
+        # 图像尺寸只读取一次，后续步骤都使用这里的值
+        src_height, src_width = image.shape[:2]
+        
+        # 无旋转、无ROI且已是目标尺寸时无需任何处理
+        if rotation_angle % 360 == 0 and not roi_coords and (src_width, src_height) == tuple(target_size):
+            return image
         
-        # 1. 先旋转图像（与预览一致）
-        processed_image = image.copy()
+        # 不复制输入图像：所有处理都只读取image，调用方（WebSocket每帧新解码的图像）
+        # 也不会在处理期间修改它
+        img_width, img_height = src_width, src_height
+        
+        # 1. 旋转只计算旋转后的画布尺寸（与预览一致），像素运算与缩放合并
         if rotation_angle != 0:
-            processed_image = ImageProcessor.rotate_image(processed_image, rotation_angle)
+            _, img_width, img_height = ImageProcessor.get_rotation_matrix(
+                src_width, src_height, rotation_angle
+            )
         
-        # 2. 如果有ROI坐标，直接在旋转后的原图上应用ROI
+        # 2. 如果有ROI坐标，直接在旋转后的坐标系中应用ROI
         # （坐标已经在get_processing_params中进行了转换）
+        roi_x, roi_y, roi_w, roi_h = 0, 0, img_width, img_height
         if roi_coords:
-            x, y, w, h = roi_coords
-            original_h, original_w = processed_image.shape[:2]
-            
             # 边界检查
-            x = max(0, min(x, original_w - 1))
-            y = max(0, min(y, original_h - 1))
-            w = min(w, original_w - x)
-            h = min(h, original_h - y)
+            x, y, w, h = _clamp_roi(*roi_coords, img_width, img_height)
             
             if w > 10 and h > 10:
-                # 直接从旋转后的原图提取ROI
-                roi_image = processed_image[y:y+h, x:x+w]
-                processed_image = roi_image
+                roi_x, roi_y, roi_w, roi_h = x, y, w, h
             else:
-                logger.warning(f"ROI区域太小: {w}x{h}, 使用原图")
+                _logger.warning("ROI区域太小: %dx%d, 使用原图", w, h)
         
-        # 3. 最后调整到目标尺寸
-        processed_image = ImageProcessor.resize_to_target(processed_image, target_size)
+        # 3. 无旋转：直接切片后缩放
+        if rotation_angle == 0:
+            roi_image = image[roi_y:roi_y+roi_h, roi_x:roi_x+roi_w]
+            return ImageProcessor.resize_to_target(roi_image, target_size, dst=dst)
         
-        return processed_image
\ No newline at end of file
+        # 3. 有旋转：一次warpAffine直接得到目标尺寸图像
+        return ImageProcessor._warp_roi_to_target(
+            image, (src_width, src_height), rotation_angle,
+            (roi_x, roi_y, roi_w, roi_h), target_size, dst=dst
+        )
@@ -0,0 +1,121 @@
+"""
+图像处理工作线程模块
+在独立的QThread中执行保存前的图像处理，避免阻塞界面线程
+"""
+
+import queue
+import logging
+import functools
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from .image_processor import ImageProcessor
+
+
+class ImageProcessingWorker(QObject):
+    """
+    图像处理工作者
+    通过moveToThread放入工作线程，经排队信号接收原始帧并返回处理结果
+    """
+    
+    # 处理完成信号 (处理后的图像或None, 处理参数)
+    frame_ready = pyqtSignal(object, object)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        
+        # 240×240输出缓冲区池：处理结果直接交给写入线程，写完后经release_buffer归还
+        # 上限覆盖写入队列(32) + 写入线程(2) + 正在处理的一帧
+        self._free_buffers = queue.SimpleQueue()
+        self._buffer_ids = set()
+        self._max_buffers = 36
+        
+        # 上一帧的处理参数及绑定好参数的处理函数
+        self._pipeline_key = None
+        self._pipeline = None
+    
+    @pyqtSlot(object, object)
+    def process(self, image, processing_params):
+        """处理一帧图像（在工作线程中执行）"""
+        output_buffer = self._acquire_buffer()
+        if output_buffer is None:
+            self.logger.warning("输出缓冲区全部被占用，丢弃该帧")
+            self.frame_ready.emit(None, processing_params)
+            return
+        
+        processed_image = self._process_image_for_saving(image, processing_params, output_buffer)
+        
+        # 无需处理时直接返回原图，缓冲区未被使用
+        if processed_image is not output_buffer:
+            self.release_buffer(output_buffer)
+        self.frame_ready.emit(processed_image, processing_params)
+    
+    def _acquire_buffer(self):
+        """取一个空闲的输出缓冲区，池满且全部占用时返回None"""
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            pass
+        
+        if len(self._buffer_ids) >= self._max_buffers:
+            return None
+        buffer = ImageProcessor.create_output_buffer((240, 240))
+        self._buffer_ids.add(id(buffer))
+        return buffer
+    
+    def release_buffer(self, image):
+        """归还输出缓冲区（可在任意线程调用，不属于缓冲区池的图像会被忽略）"""
+        if image is not None and id(image) in self._buffer_ids:
+            self._free_buffers.put(image)
+    
+    def _process_image_for_saving(self, image, processing_params, output_buffer):
+        """处理图像用于保存 - 使用所见即所得方式"""
+        try:
+            if image is None:
+                self.logger.warning("输入图像为空")
+                return None
+            
+            return self._get_pipeline(processing_params)(image, dst=output_buffer)
+        
+        except Exception as e:
+            self.logger.error(f"处理图像失败: {e}")
+            return None
+    
+    def _get_pipeline(self, processing_params):
+        """获取绑定好参数的处理函数，参数与上一帧相同时直接复用"""
+        roi_coords = processing_params.get('roi_coords') if processing_params.get('roi_enabled') else None
+        if roi_coords is not None:
+            roi_coords = tuple(roi_coords)
+        preview_size = processing_params.get('preview_size')
+        key = (
+            processing_params.get('rotation_angle', 0),
+            roi_coords,
+            preview_size,
+            processing_params.get('scale_factor', 1.0),
+        )
+        if key == self._pipeline_key:
+            return self._pipeline
+        
+        # 使用所见即所得的处理方法
+        if preview_size:
+            # 有预览尺寸信息，使用所见即所得处理
+            pipeline = functools.partial(
+                ImageProcessor.process_image_pipeline_wysiwyg,
+                rotation_angle=key[0],
+                roi_coords=roi_coords,
+                target_size=(240, 240),
+                preview_size=preview_size
+            )
+        else:
+            # 没有预览尺寸信息，使用原来的方法
+            pipeline = functools.partial(
+                ImageProcessor.process_image_pipeline,
+                rotation_angle=key[0],
+                roi_coords=roi_coords,
+                target_size=(240, 240),
+                scale_factor=key[3]
+            )
+        
+        self._pipeline_key = key
+        self._pipeline = pipeline
+        return pipeline
@@ -5,13 +5,16 @@
 """
 
 import time
+import functools
+import collections
 from datetime import datetime
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
+from PyQt5.QtCore import QObject, pyqtSignal, QTimer, QThread
 from PyQt5.QtWidgets import QMessageBox
 
 from ..config.settings import RecordingStageConfig
 from .recording_session import MultiStageSession
-from .image_processor import ImageProcessor
+from .image_worker import ImageProcessingWorker
+from .session_packager import SessionPackager
 
 
 class MultiStageManager(QObject):
@@ -30,6 +33,9 @@ class MultiStageManager(QObject):
     countdown_changed = pyqtSignal(int)  # 倒计时变化
     progress_updated = pyqtSignal(int, int, int)  # 进度更新 (stage, current, total)
     
+    # 内部信号：提交图像到处理线程 (image, processing_params)
+    _process_requested = pyqtSignal(object, object)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.recording_stages = RecordingStageConfig.get_default_stages()
@@ -50,16 +56,27 @@ class MultiStageManager(QObject):
         import logging
         self.logger = logging.getLogger(__name__)
         
-        # 定时器
-        self.stage_timer = QTimer()
-        self.stage_timer.timeout.connect(self._capture_stage_image)
-        
-        # 阶段时长定时器
+        # 阶段时长定时器（图像捕获由收到的每一帧驱动，不使用轮询定时器）
         self.stage_duration_timer = QTimer()
         self.stage_duration_timer.timeout.connect(self._complete_current_stage)
         
         self.duration_timer = QTimer()
         self.session_start_time = None
+        
+        # 图像处理线程：warpAffine/resize不占用界面线程
+        # 已提交处理线程、尚未返回的帧所属阶段（按提交顺序返回）；
+        # 数量上限与处理线程的输出缓冲区池(36)一致，超出时丢弃并计数
+        self._in_flight_stages = collections.deque()
+        self._max_frames_in_flight = 36
+        self._dropped_frame_count = 0
+        self._processing_thread = QThread()
+        self._processing_worker = ImageProcessingWorker()
+        self._processing_worker.moveToThread(self._processing_thread)
+        self._process_requested.connect(self._processing_worker.process)
+        self._processing_worker.frame_ready.connect(self._on_frame_processed)
+        
+        # 录制结束后的打包线程
+        self._packager = None
     
     def set_recording_stages(self, stages):
         """设置录制阶段配置"""
@@ -74,9 +91,15 @@ class MultiStageManager(QObject):
         # 保存WebSocket客户端引用
         self.websocket_client = websocket_client
         
+        if not self._processing_thread.isRunning():
+            self._processing_thread.start()
+        
         # 初始化会话
         self.session = MultiStageSession(user_info, save_path, self.recording_stages)
         if not self.session.current_session_folder:
+            # 会话构造时已启动写入线程，失败时需关闭
+            self.session.close()
+            self.session = None
             QMessageBox.critical(None, "❌ 错误", "无法创建保存文件夹")
             return False
         
@@ -97,13 +120,16 @@ class MultiStageManager(QObject):
         self.is_recording = False
         
         # 停止所有定时器
-        self.stage_timer.stop()
         self.stage_duration_timer.stop()
         self.duration_timer.stop()
         
         if self.voice_guide:
             self.voice_guide.stop()
             self.voice_guide = None
+        
+        # 等待已入队的图像写入完成（打包线程运行时由其负责）
+        if self.session and not self._packager:
+            self.session.close()
     
     def _start_stage(self, stage_index):
         """开始指定阶段"""
@@ -135,12 +161,10 @@ class MultiStageManager(QObject):
         stage = self.recording_stages[stage_index]
         self.is_recording = True
         self.stage_recording_count = 0
+        self._dropped_frame_count = 0
         self.stage_start_time = time.time()
         self.last_capture_time = 0
         
-        # 删除图像捕获定时器，现在收到图就立即录制
-        # self.stage_timer.start(stage['interval_ms'])
-        
         # 启动阶段时长定时器（5秒后自动完成）
         duration_ms = stage['duration_seconds'] * 1000
         self.stage_duration_timer.start(duration_ms)
@@ -150,16 +174,21 @@ class MultiStageManager(QObject):
         
         self.logger.info(f"开始阶段 {stage_index + 1} 录制: {stage.get('display_name', stage['name'])}, 时长: {stage['duration_seconds']}秒 - 收到图像立即录制")
     
-    def capture_current_image(self):
-        """捕获当前图像（由外部调用）"""
-        return self._capture_stage_image()
+    def capture_current_image(self, image=None):
+        """
+        捕获当前图像（由外部调用）
+        
+        Args:
+            image: 刚收到的图像；为None时从WebSocket客户端读取最新一帧
+        """
+        return self._capture_stage_image(image)
     
-    def _capture_stage_image(self):
+    def _capture_stage_image(self, image=None):
         """阶段图像捕获（收到图像时触发）- 修复版"""
         if not self.is_multi_stage_active or not self.is_recording:
             return False
         
-        if not self.websocket_client:
+        if image is None and not self.websocket_client:
             self.logger.warning("WebSocket客户端不可用")
             return False
         
@@ -170,23 +199,42 @@ class MultiStageManager(QObject):
             return False
         self.last_capture_time = current_time
         
-        # 获取当前图像
-        current_image = self.websocket_client.get_current_image()
+        # 获取当前图像（优先使用随信号送达的帧，无需再向客户端查询）
+        current_image = image if image is not None else self.websocket_client.get_current_image()
         if current_image is None:
             return False
         
+        if len(self._in_flight_stages) >= self._max_frames_in_flight:
+            self._dropped_frame_count += 1
+            return False
+        
+        # 处理参数在界面线程获取，图像处理交给工作线程
+        processing_params = self._get_processing_params()
+        self._in_flight_stages.append(self.current_stage)
+        self._process_requested.emit(current_image, processing_params)
+        return True
+    
+    def _on_frame_processed(self, processed_image, processing_params):
+        """工作线程处理完成后保存图像（界面线程）"""
+        frame_stage = self._in_flight_stages.popleft()
+        
+        # 处理期间阶段已结束或切换，丢弃该帧
+        if (not self.is_recording or not self.session or 
+                frame_stage != self.current_stage):
+            self._processing_worker.release_buffer(processed_image)
+            return
+        
+        if processed_image is None:
+            self.logger.warning("图像处理失败")
+            return
+        
+        filepath = None
         try:
-            # 获取处理参数
-            processing_params = self._get_processing_params()
-            
-            # 处理图像
-            processed_image = self._process_image_for_saving(current_image, processing_params)
-            if processed_image is None:
-                self.logger.warning("图像处理失败")
-                return False
-            
-            # 保存阶段图像
-            filepath = self.session.save_stage_image(processed_image, processing_params)
+            # 保存阶段图像：缓冲区直接交给写入线程，写完后归还给处理线程，无需复制
+            filepath = self.session.save_stage_image(
+                processed_image, processing_params,
+                on_written=functools.partial(self._processing_worker.release_buffer, processed_image)
+            )
             
             if filepath:
                 self.stage_recording_count += 1
@@ -202,53 +250,19 @@ class MultiStageManager(QObject):
                     self.stage_recording_count, 
                     progress_percent
                 )
-                
-                return True
             else:
                 self.logger.warning("图像保存失败")
-                return False
                 
         except Exception as e:
-            self.logger.error(f"捕获阶段图像时出错: {e}")
-            return False
-    
-    def _process_image_for_saving(self, image, processing_params):
-        """处理图像用于保存 - 使用所见即所得方式"""
-        try:
-            if image is None:
-                self.logger.warning("输入图像为空")
-                return None
-            
-            # 使用所见即所得的处理方法
-            if processing_params.get('preview_size'):
-                # 有预览尺寸信息，使用所见即所得处理
-                processed_image = ImageProcessor.process_image_pipeline_wysiwyg(
-                    image,
-                    rotation_angle=processing_params.get('rotation_angle', 0),
-                    roi_coords=processing_params.get('roi_coords') if processing_params.get('roi_enabled') else None,
-                    target_size=(240, 240),
-                    preview_size=processing_params.get('preview_size')
-                )
-            else:
-                # 没有预览尺寸信息，使用原来的方法
-                processed_image = ImageProcessor.process_image_pipeline(
-                    image,
-                    rotation_angle=processing_params.get('rotation_angle', 0),
-                    roi_coords=processing_params.get('roi_coords') if processing_params.get('roi_enabled') else None,
-                    target_size=(240, 240),
-                    scale_factor=processing_params.get('scale_factor', 1.0)
-                )
-            
-            return processed_image
-            
-        except Exception as e:
-            self.logger.error(f"处理图像失败: {e}")
-            return None
+            self.logger.error(f"保存阶段图像时出错: {e}")
+        finally:
+            # 未能入队时缓冲区仍归调用方所有
+            if not filepath:
+                self._processing_worker.release_buffer(processed_image)
     
     def _complete_current_stage(self):
         """完成当前阶段"""
         # 停止定时器
-        self.stage_timer.stop()
         self.stage_duration_timer.stop()
         self.is_recording = False
         
@@ -260,7 +274,8 @@ class MultiStageManager(QObject):
         self.recording_stopped.emit(self.current_stage + 1)
         
         self.logger.info(f"完成阶段 {self.current_stage + 1}: {stage.get('display_name', stage['name'])}, "
-                        f"用时: {elapsed_time:.1f}秒, 采集: {self.stage_recording_count}张")
+                        f"用时: {elapsed_time:.1f}秒, 采集: {self.stage_recording_count}张, "
+                        f"处理繁忙丢弃: {self._dropped_frame_count}帧")
         
         # 切换到下一阶段
         self.session.next_stage()  # 调用session的next_stage方法
@@ -270,38 +285,45 @@ class MultiStageManager(QObject):
     
     def _complete_all_stages(self):
         """完成所有阶段"""
-        import os
         self.is_multi_stage_active = False
         self.is_recording = False
         
         # 停止所有定时器
-        self.stage_timer.stop()
         self.stage_duration_timer.stop()
         self.duration_timer.stop()
         
-        # 创建汇总报告
-        if self.session:
-            self.session.create_multi_stage_summary()
-            self.session.create_session_report()
+        if not self.session:
+            self.all_stages_completed.emit()
+            return
+        
+        # 汇总报告和压缩包在后台线程创建，完成后再发送完成信号
+        self.voice_message_changed.emit("正在打包录制数据，请稍候...")
+        self._packager = SessionPackager(self.session)
+        self._packager.package_ready.connect(self._on_package_ready)
+        self._packager.start()
+    
+    def _on_package_ready(self, zip_path, image_count):
+        """打包完成（界面线程）"""
+        import os
+        # 信号在run()末尾发出，等待线程完全退出后再释放
+        self._packager.wait()
+        self._packager = None
+        
+        if zip_path:
+            self.logger.info(f"数据包已创建: {zip_path}")
             
-            # 自动创建压缩包
-            zip_path = self.session.create_session_package()
-            if zip_path:
-                self.logger.info(f"数据包已创建: {zip_path}")
-                
-                # 修复：改进的文件夹打开逻辑
-                self._open_result_folder(zip_path)
-                
-                # 显示成功消息
-                from PyQt5.QtWidgets import QMessageBox
-                QMessageBox.information(
-                    None,
-                    "🎉 录制完成",
-                    f"眼球数据录制已完成！\n\n"
-                    f"数据包已自动创建：\n{os.path.basename(zip_path)}\n\n"
-                    f"包含 {self.session.recording_count} 张图像\n\n"
-                    f"保存位置：{os.path.dirname(zip_path)}"
-                )
+            # 修复：改进的文件夹打开逻辑
+            self._open_result_folder(zip_path)
+            
+            # 显示成功消息
+            QMessageBox.information(
+                None,
+                "🎉 录制完成",
+                f"眼球数据录制已完成！\n\n"
+                f"数据包已自动创建：\n{os.path.basename(zip_path)}\n\n"
+                f"包含 {image_count} 张图像\n\n"
+                f"保存位置：{os.path.dirname(zip_path)}"
+            )
         
         # 发送完成信号
         self.all_stages_completed.emit()
@@ -351,6 +373,14 @@ class MultiStageManager(QObject):
             return None
         return self.session.get_session_info()
     
+    def shutdown(self):
+        """停止录制并结束图像处理线程（程序退出时调用）"""
+        self.stop_multi_stage_recording()
+        if self._packager:
+            self._packager.wait()
+        self._processing_thread.quit()
+        self._processing_thread.wait()
+    
     def is_active(self):
         """检查是否正在进行多阶段录制"""
         return self.is_multi_stage_active
@@ -9,9 +9,33 @@ import zipfile
 import shutil
 import time
 import logging
+import functools
+import collections
 from datetime import datetime
 from typing import Dict, List, Optional
 
+import numpy as np
+
+from ..config.settings import AppConstants
+from .disk_writer import DiskWriter
+
+# 可选：orjson序列化更快，不可用时回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _write_json(filepath, data):
+    """将字典写入UTF-8 JSON文件（缩进2格，保留中文）"""
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
 
 class RecordingSession:
     """
@@ -19,6 +43,9 @@ class RecordingSession:
     负责管理单次录制会话的所有方面
     """
     
+    # 已确认存在的文件夹每隔这么多帧重新检查一次（防止录制中途被删除）
+    _FOLDER_RECHECK_INTERVAL = 1000
+    
     def __init__(self, user_info: Dict, save_path: str, session_type: str = "single"):
         self.logger = logging.getLogger(__name__)
         self.user_info = user_info
@@ -27,6 +54,23 @@ class RecordingSession:
         self.session_start_time = time.time()
         self.recording_count = 0
         self.current_session_folder = None
+        self.image_quality = AppConstants.DEFAULT_IMAGE_QUALITY
+        
+        # 已确认存在的文件夹，避免每帧stat
+        self._verified_folders = set()
+        self._next_folder_check = self._FOLDER_RECHECK_INTERVAL
+        
+        # 文件名时间戳的秒级前缀缓存，同一秒内的帧只需拼接毫秒
+        self._ts_second = None
+        self._ts_prefix = ""
+        
+        # 文件名后缀缓存 {(旋转角度, 是否ROI): 后缀}，处理参数在录制中很少变化
+        self._suffix_cache = {}
+        
+        # 后台写入线程，图像编码和写盘不阻塞录制
+        self._writer = DiskWriter()
+        # 帧缓冲池：复用入队图像的副本，写入完成后归还，避免每帧重新分配内存
+        self._frame_pool = collections.deque()
         
         # 调试信息
         self.logger.info(f"初始化录制会话: {session_type}")
@@ -63,6 +107,7 @@ class RecordingSession:
             # 验证文件夹是否成功创建
             if os.path.exists(self.current_session_folder):
                 self.logger.info(f"文件夹创建成功: {self.current_session_folder}")
+                self._verified_folders.add(self.current_session_folder)
                 return True
             else:
                 self.logger.error(f"文件夹创建失败: {self.current_session_folder}")
@@ -91,77 +136,104 @@ class RecordingSession:
             self.logger.error("会话文件夹未初始化")
             return None
         
-        if not os.path.exists(self.current_session_folder):
+        if not self._folder_exists(self.current_session_folder):
             self.logger.error(f"会话文件夹不存在: {self.current_session_folder}")
             return None
         
         try:
             # 生成文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            timestamp = self._frame_timestamp()
             
             # 根据处理参数添加后缀
-            suffix_parts = []
-            if processing_params:
-                if processing_params.get('rotation_angle', 0) != 0:
-                    suffix_parts.append(f"rot{processing_params['rotation_angle']}")
-                if processing_params.get('roi_enabled', False):
-                    suffix_parts.append("roi")
-                    
-            suffix = "_" + "_".join(suffix_parts) if suffix_parts else ""
+            suffix = self._get_suffix(processing_params)
             filename = f"img_{timestamp}_{self.recording_count:06d}{suffix}_240x240.jpg"
             filepath = os.path.join(self.current_session_folder, filename)
             
-            # 保存为JPG格式，质量100（最高质量）
-            import cv2
-            
-            # 检查cv2.imwrite的返回值
-            success = cv2.imwrite(filepath, image, [cv2.IMWRITE_JPEG_QUALITY, 100])
-            
-            if success:
-                # 验证文件是否真的被保存
-                if os.path.exists(filepath):
-                    file_size = os.path.getsize(filepath)
-                    self.logger.info(f"图像保存成功: {filename}, 大小: {file_size} 字节")
-                    self.recording_count += 1
-                    return filepath
-                else:
-                    self.logger.error(f"cv2.imwrite返回成功但文件不存在: {filepath}")
-                    return None
-            else:
-                self.logger.error(f"cv2.imwrite保存失败: {filepath}")
-                
-                # 尝试使用替代方法保存
-                try:
-                    import cv2
-                    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 100]
-                    result, encimg = cv2.imencode('.jpg', image, encode_param)
-                    if result:
-                        encimg.tofile(filepath)
-                        if os.path.exists(filepath):
-                            file_size = os.path.getsize(filepath)
-                            self.logger.info(f"使用替代方法保存成功: {filename}, 大小: {file_size} 字节")
-                            self.recording_count += 1
-                            return filepath
-                        else:
-                            self.logger.error(f"替代方法也失败: {filepath}")
-                    else:
-                        self.logger.error("图像编码失败")
-                except Exception as e2:
-                    self.logger.error(f"替代保存方法异常: {e2}")
-                
+            # 复制后交给后台写入线程编码保存，录制线程不等待编码和写盘
+            if not self._submit_copy(filepath, image):
                 return None
             
+            self.recording_count += 1
+            return filepath
+            
         except Exception as e:
             self.logger.error(f"保存图像异常: {e}")
             import traceback
             self.logger.error(f"异常堆栈: {traceback.format_exc()}")
             return None
     
+    def _frame_timestamp(self):
+        """生成 YYYYmmdd_HHMMSS_mmm 格式的时间戳，秒级部分每秒只格式化一次"""
+        now = time.time()
+        second = int(now)
+        if second != self._ts_second:
+            self._ts_second = second
+            self._ts_prefix = time.strftime("%Y%m%d_%H%M%S", time.localtime(second))
+        return f"{self._ts_prefix}_{int((now - second) * 1000):03d}"
+    
+    def _get_suffix(self, processing_params):
+        """根据处理参数生成文件名后缀（如 _rot90_roi），结果缓存"""
+        if not processing_params:
+            return ""
+        
+        key = (processing_params.get('rotation_angle', 0), processing_params.get('roi_enabled', False))
+        suffix = self._suffix_cache.get(key)
+        if suffix is None:
+            rotation_angle, roi_enabled = key
+            suffix_parts = []
+            if rotation_angle != 0:
+                suffix_parts.append(f"rot{rotation_angle}")
+            if roi_enabled:
+                suffix_parts.append("roi")
+            suffix = "_" + "_".join(suffix_parts) if suffix_parts else ""
+            self._suffix_cache[key] = suffix
+        return suffix
+    
+    def _folder_exists(self, folder):
+        """检查文件夹是否存在，结果缓存，每隔_FOLDER_RECHECK_INTERVAL帧重新确认"""
+        if self.recording_count >= self._next_folder_check:
+            self._verified_folders.clear()
+            self._next_folder_check = self.recording_count + self._FOLDER_RECHECK_INTERVAL
+        
+        if folder in self._verified_folders:
+            return True
+        if os.path.exists(folder):
+            self._verified_folders.add(folder)
+            return True
+        return False
+    
+    def _submit_copy(self, filepath, image):
+        """将图像复制到池中缓冲区后提交写入，写入完成后缓冲区自动归还"""
+        buffer = self._frame_pool.pop() if self._frame_pool else None
+        if buffer is None or buffer.shape != image.shape or buffer.dtype != image.dtype:
+            buffer = np.empty_like(image)
+        np.copyto(buffer, image)
+        
+        release = functools.partial(self._frame_pool.append, buffer)
+        if not self._writer.submit(filepath, buffer, self.image_quality, release):
+            release()
+            return False
+        return True
+    
+    def flush(self):
+        """等待已提交的图像全部写入磁盘"""
+        self._writer.flush()
+    
+    def close(self):
+        """等待所有图像写入完成并结束写入线程"""
+        self._writer.close()
+        if self._writer.dropped_count or self._writer.failed_count:
+            self.logger.warning(f"图像写入统计: 成功 {self._writer.written_count}, "
+                                f"失败 {self._writer.failed_count}, 丢弃 {self._writer.dropped_count}")
+    
     def create_session_report(self):
         """创建会话报告"""
         if not self.current_session_folder:
             self.logger.warning("无法创建会话报告：会话文件夹不存在")
             return None
+        
+        # 报告统计磁盘上的文件，先等待写入完成
+        self.flush()
             
         try:
             report = {
@@ -177,24 +249,25 @@ class RecordingSession:
                 "files": []
             }
             
-            # 添加文件列表
-            if os.path.exists(self.current_session_folder):
-                for filename in os.listdir(self.current_session_folder):
-                    if filename.endswith('.jpg'):
-                        filepath = os.path.join(self.current_session_folder, filename)
-                        file_info = {
-                            "filename": filename,
-                            "size_bytes": os.path.getsize(filepath),
-                            "created_time": datetime.fromtimestamp(
-                                os.path.getctime(filepath)
-                            ).isoformat()
-                        }
-                        report["files"].append(file_info)
+            # 添加文件列表（使用写入时记录的信息，不再逐个stat文件）
+            # 同一秒内写入的文件共享秒级ISO时间前缀，只需格式化一次
+            second_prefixes = {}
+            for filepath, size_bytes, written_time in self._writer.written_files:
+                if os.path.dirname(filepath) == self.current_session_folder:
+                    second = int(written_time)
+                    prefix = second_prefixes.get(second)
+                    if prefix is None:
+                        prefix = second_prefixes[second] = datetime.fromtimestamp(second).isoformat()
+                    file_info = {
+                        "filename": os.path.basename(filepath),
+                        "size_bytes": size_bytes,
+                        "created_time": f"{prefix}.{int((written_time - second) * 1000000):06d}"
+                    }
+                    report["files"].append(file_info)
             
             # 保存报告
             report_file = os.path.join(self.current_session_folder, "session_report.json")
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(report, f, ensure_ascii=False, indent=2)
+            _write_json(report_file, report)
             
             self.logger.info(f"会话报告创建成功: {report_file}")
             return report_file
@@ -213,14 +286,18 @@ class RecordingSession:
             zip_filename = f"{os.path.basename(self.current_session_folder)}.zip"
             zip_filepath = os.path.join(os.path.dirname(self.current_session_folder), zip_filename)
             
-            with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            # 大缓冲区写入，合并zipfile逐块产生的小写操作
+            with open(zip_filepath, 'wb', buffering=8 * 1024 * 1024) as fh, \
+                    zipfile.ZipFile(fh, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
                 # 添加所有文件到ZIP
-                for root, dirs, files in os.walk(self.current_session_folder):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arc_path = os.path.relpath(file_path, 
-                                                  os.path.dirname(self.current_session_folder))
-                        zipf.write(file_path, arc_path)
+                base_len = len(os.path.dirname(self.current_session_folder)) + 1
+                for entry in self._iter_files(self.current_session_folder):
+                    arc_path = entry.path[base_len:]
+                    # JPEG本身已压缩，再DEFLATE几乎不减小体积，直接存储；报告等文本文件快速压缩
+                    if entry.name.lower().endswith(('.jpg', '.jpeg')):
+                        zipf.write(entry.path, arc_path, compress_type=zipfile.ZIP_STORED)
+                    else:
+                        zipf.write(entry.path, arc_path)
             
             self.logger.info(f"数据包创建成功: {zip_filepath}")
             return zip_filepath
@@ -229,6 +306,17 @@ class RecordingSession:
             self.logger.error(f"创建会话数据包失败: {e}")
             return None
     
+    @classmethod
+    def _iter_files(cls, folder):
+        """递归遍历文件夹中的文件（os.scandir直接返回类型信息，无需逐个stat）"""
+        with os.scandir(folder) as it:
+            entries = list(it)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from cls._iter_files(entry.path)
+            elif entry.is_file():
+                yield entry
+    
     def get_session_info(self):
         """获取会话信息"""
         return {
@@ -271,19 +359,28 @@ class MultiStageSession(RecordingSession):
             )
             try:
                 self.logger.info(f"创建阶段文件夹: {stage_folder}")
+                # makedirs失败时会抛出异常，返回即说明文件夹已存在，无需再stat确认
                 os.makedirs(stage_folder, exist_ok=True)
-                
-                if os.path.exists(stage_folder):
-                    self.stage_folders.append(stage_folder)
-                    self.logger.info(f"阶段文件夹创建成功: {stage_folder}")
-                else:
-                    self.logger.error(f"阶段文件夹创建失败: {stage_folder}")
+                self.stage_folders.append(stage_folder)
+                self._verified_folders.add(stage_folder)
+                self.logger.info(f"阶段文件夹创建成功: {stage_folder}")
                     
             except Exception as e:
                 self.logger.error(f"创建阶段文件夹异常: {e}")
     
-    def save_stage_image(self, image, processing_params: Dict = None):
-        """保存阶段图像"""
+    def save_stage_image(self, image, processing_params: Dict = None, on_written=None):
+        """
+        保存阶段图像
+        
+        Args:
+            image: 要保存的图像
+            processing_params: 处理参数字典
+            on_written: 可选回调。提供时图像所有权转交给写入线程（不复制），
+                        写入完成后调用该回调；返回None表示未入队，所有权仍归调用方
+        
+        Returns:
+            保存的文件路径
+        """
         if (image is None or 
             self.current_stage >= len(self.stage_folders) or 
             not self.stage_folders[self.current_stage]):
@@ -293,68 +390,35 @@ class MultiStageSession(RecordingSession):
         try:
             # 检查阶段文件夹是否存在
             stage_folder = self.stage_folders[self.current_stage]
-            if not os.path.exists(stage_folder):
+            if not self._folder_exists(stage_folder):
                 self.logger.error(f"阶段文件夹不存在: {stage_folder}")
                 return None
             
             # 生成文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+            timestamp = self._frame_timestamp()
             stage = self.recording_stages[self.current_stage]
             
             # 使用英文名称避免路径问题
             stage_name = stage.get('name', f'stage_{self.current_stage+1}')
             
             # 添加处理后缀
-            suffix_parts = []
-            if processing_params:
-                if processing_params.get('rotation_angle', 0) != 0:
-                    suffix_parts.append(f"rot{processing_params['rotation_angle']}")
-                if processing_params.get('roi_enabled', False):
-                    suffix_parts.append("roi")
-                    
-            suffix = "_" + "_".join(suffix_parts) if suffix_parts else ""
+            suffix = self._get_suffix(processing_params)
             filename = f"{stage_name}_{timestamp}_{self.stage_recording_count:06d}{suffix}_240x240.jpg"
             filepath = os.path.join(stage_folder, filename)
             
-            # 使用cv2.imencode方法避免中文路径问题
-            import cv2
-            try:
-                encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 100]
-                result, encimg = cv2.imencode('.jpg', image, encode_param)
-                if result:
-                    encimg.tofile(filepath)
-                    if os.path.exists(filepath):
-                        file_size = os.path.getsize(filepath)
-                        self.logger.info(f"阶段图像保存成功: {filename}, 大小: {file_size} 字节")
-                        
-                        # 更新计数
-                        self.stage_recording_count += 1
-                        self.recording_count += 1
-                        
-                        return filepath
-                    else:
-                        self.logger.error(f"图像编码保存失败: {filepath}")
-                else:
-                    self.logger.error("图像编码失败")
-            except Exception as encode_error:
-                self.logger.error(f"图像编码异常: {encode_error}")
-            
-            # 如果imencode失败，尝试cv2.imwrite（仅用于调试）
-            success = cv2.imwrite(filepath, image, [cv2.IMWRITE_JPEG_QUALITY, 100])
-            
-            if success and os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
-                self.logger.info(f"阶段图像cv2.imwrite保存成功: {filename}, 大小: {file_size} 字节")
-                
-                # 更新计数
-                self.stage_recording_count += 1
-                self.recording_count += 1
-                
-                return filepath
-            else:
-                self.logger.error(f"所有保存方法都失败: {filepath}")
+            # 交给后台写入线程编码保存；未转交所有权时先复制（调用方的缓冲区可能被复用）
+            if on_written is None:
+                if not self._submit_copy(filepath, image):
+                    return None
+            elif not self._writer.submit(filepath, image, self.image_quality, on_written):
                 return None
             
+            # 更新计数
+            self.stage_recording_count += 1
+            self.recording_count += 1
+            
+            return filepath
+            
         except Exception as e:
             self.logger.error(f"保存阶段图像异常: {e}")
             import traceback
@@ -388,6 +452,9 @@ class MultiStageSession(RecordingSession):
         if not self.current_session_folder:
             self.logger.warning("无法创建多阶段汇总：会话文件夹不存在")
             return None
+        
+        # 汇总统计磁盘上的文件，先等待写入完成
+        self.flush()
             
         try:
             summary = {
@@ -401,29 +468,29 @@ class MultiStageSession(RecordingSession):
                 "stages": []
             }
             
-            # 统计各阶段信息
+            # 统计各阶段信息（按写入记录计数，不再扫描文件夹）
+            written_counts = collections.Counter(
+                os.path.dirname(filepath) for filepath, _, _ in self._writer.written_files
+            )
             for i, stage in enumerate(self.recording_stages):
                 if i < len(self.stage_folders):
-                    stage_folder = self.stage_folders[i]
-                    stage_images = [f for f in os.listdir(stage_folder) 
-                                  if f.endswith('.jpg')] if os.path.exists(stage_folder) else []
+                    stage_count = written_counts[self.stage_folders[i]]
                     
                     stage_info = {
                         "stage_number": i + 1,
                         "stage_name": stage['name'],
                         "description": stage['description'],
                         "duration_seconds": stage.get('duration_seconds', 5),
-                        "actual_count": len(stage_images),
+                        "actual_count": stage_count,
                         "interval_ms": stage['interval_ms'],
                         "folder": f"stage_{i+1}_{stage['name']}"
                     }
                     summary["stages"].append(stage_info)
-                    self.logger.info(f"阶段 {i+1} 统计: {len(stage_images)} 张图像")
+                    self.logger.info(f"阶段 {i+1} 统计: {stage_count} 张图像")
             
             # 保存汇总文件
             summary_file = os.path.join(self.current_session_folder, "multi_stage_summary.json")
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, ensure_ascii=False, indent=2)
+            _write_json(summary_file, summary)
             
             self.logger.info(f"多阶段汇总创建成功: {summary_file}")
             return summary_file
@@ -0,0 +1,41 @@
+"""
+会话打包模块
+在后台线程中完成录制结束后的汇总、报告和压缩包创建，避免界面冻结
+"""
+
+import logging
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class SessionPackager(QThread):
+    """
+    会话打包线程
+    等待图像写入完成后生成汇总报告并打包，完成后发出package_ready信号
+    """
+    
+    # 打包完成信号 (压缩包路径或None, 会话图像数)
+    # 图像数随信号发出：打包期间管理器可能已开始新的会话
+    package_ready = pyqtSignal(object, int)
+    
+    def __init__(self, session, parent=None):
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.session = session
+    
+    def run(self):
+        """线程主函数"""
+        zip_path = None
+        image_count = 0
+        try:
+            # 汇总统计磁盘上的文件，先等待全部写入完成
+            self.session.close()
+            image_count = self.session.recording_count
+            self.session.create_multi_stage_summary()
+            self.session.create_session_report()
+            
+            # 自动创建压缩包
+            zip_path = self.session.create_session_package()
+        except Exception as e:
+            self.logger.error(f"打包会话数据失败: {e}")
+        
+        self.package_ready.emit(zip_path, image_count)
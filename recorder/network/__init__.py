@@ -3,8 +3,24 @@
 包含WebSocket连接等网络相关功能
 """
 
-from .websocket_manager import WebSocketManager
+import importlib
 
-__all__ = [
-    'WebSocketManager'
-]
+# 按需导入，避免导入包时加载websockets/asyncio
+_lazy_imports = {
+    'WebSocketManager': '.websocket_manager',
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    module_path = _lazy_imports.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
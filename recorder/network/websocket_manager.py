@@ -8,12 +8,83 @@ import logging
 import asyncio
 import threading
 import time
+import collections
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
 import cv2
 import numpy as np
 import websockets
 from PyQt5.QtCore import QObject, pyqtSignal
 
+# 可选：PyTurboJPEG（libjpeg-turbo）解码更快，不可用时回退到cv2.imdecode
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except Exception:  # 未安装PyTurboJPEG或找不到libturbojpeg动态库
+    _turbo_jpeg = None
+
+# 可选：orjson解析JSON更快（其JSONDecodeError是json.JSONDecodeError的子类）
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# 可选：pybase64（SIMD加速）解码更快，不可用时使用标准库base64
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# 可选：uvloop（仅Linux/macOS）事件循环开销更低，不可用时使用标准asyncio事件循环
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# 在帧末尾多少字节内查找JPEG结束标记
+_JPEG_EOI_SEARCH_BYTES = 64
+
+
+def _decode_jpeg_bytes(data):
+    """将图像字节解码为BGR图像，失败返回None"""
+    if _turbo_jpeg is not None:
+        try:
+            return _turbo_jpeg.decode(data, pixel_format=TJPF_BGR)
+        except Exception:
+            pass  # 非JPEG数据（如PNG）交给OpenCV处理
+    
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class _Connection:
+    """
+    单个连接线程独占的状态
+    每次connect()新建一个，disconnect()只通知对应的线程退出，不会影响之后新建的连接
+    """
+    
+    def __init__(self):
+        self.stop_event = threading.Event()  # 连接线程的循环条件
+        self.loop = None        # 连接线程的事件循环
+        self.websocket = None   # 当前打开的websocket
+        self.wakeup = None      # 唤醒重连等待的asyncio.Event（在连接线程中创建）
+    
+    def stop(self):
+        """通知连接线程退出（可在任意线程调用）"""
+        self.stop_event.set()
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._close_in_loop)
+            except RuntimeError:
+                pass  # 事件循环已关闭，连接线程已经退出
+    
+    def _close_in_loop(self):
+        """在连接线程的事件循环中执行：唤醒重连等待并关闭连接"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+        if self.websocket is not None:
+            asyncio.ensure_future(self.websocket.close())
+
 
 class WebSocketManager(QObject):
     """
@@ -36,7 +107,7 @@ class WebSocketManager(QObject):
         self.is_running = False
         self.current_image = None
         self.connection_thread = None
-        self.url_variants = []  # URL变体列表
+        self.url_variants = ()  # URL变体（元组）
         self.current_url_index = 0  # 当前尝试的URL索引
         
         # 设置日志
@@ -46,6 +117,11 @@ class WebSocketManager(QObject):
         self.image_count = 0
         self.last_image_time = 0
         
+        self._base64_warned = False  # base64图像提示只输出一次
+        
+        # 当前连接线程的状态，disconnect()通过它通知该线程立即退出
+        self._connection = None
+        
         # 重连参数 - 关闭所有超时
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = float('inf')  # 无限重连
@@ -61,22 +137,19 @@ class WebSocketManager(QObject):
         if not self.url:
             return
             
-        base_url = self.url.replace('ws://', '').replace('wss://', '')
+        # 去掉协议前缀（urlparse会把 "host:port" 误解析为协议，这里只处理ws/wss）
+        prefix, sep, rest = self.url.partition('://')
+        base_url = rest if sep and prefix in ('ws', 'wss') else self.url
         
         # 生成不同的URL变体
-        self.url_variants = [
-            f"ws://{base_url}",
-            f"wss://{base_url}"
-        ]
+        variants = [f"ws://{base_url}", f"wss://{base_url}"]
         
         # 如果没有端口，尝试常见端口
         if ':' not in base_url:
-            self.url_variants.extend([
-                f"ws://{base_url}:8080",
-                f"ws://{base_url}:3000",
-                f"wss://{base_url}:8080",
-                f"wss://{base_url}:3000"
-            ])
+            variants += [f"{scheme}://{base_url}{port}"
+                         for scheme in ('ws', 'wss') for port in (':8080', ':3000')]
+        
+        self.url_variants = tuple(variants)
     
     def connect(self):
         """连接到WebSocket服务器"""
@@ -91,8 +164,9 @@ class WebSocketManager(QObject):
         self.reconnect_attempts = 0
         self.current_url_index = 0
         
-        # 在新线程中启动连接
-        self.connection_thread = threading.Thread(target=self._run_connection)
+        # 在新线程中启动连接（旧线程可能仍在关闭，新线程使用独立的状态）
+        self._connection = _Connection()
+        self.connection_thread = threading.Thread(target=self._run_connection, args=(self._connection,))
         self.connection_thread.daemon = True
         self.connection_thread.start()
         
@@ -102,7 +176,12 @@ class WebSocketManager(QObject):
         """断开WebSocket连接"""
         self.is_running = False
         
-        # 清除状态，websocket将在连接线程中被自动关闭
+        # 在连接线程的事件循环中关闭websocket并结束重连等待（不能在调用方线程中直接操作）
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.stop()
+        
+        # 清除状态
         self.is_connected_flag = False
         self.current_image = None
         self.websocket = None
@@ -118,22 +197,44 @@ class WebSocketManager(QObject):
         """获取当前图像"""
         return self.current_image
     
-    def _run_connection(self):
+    def _run_connection(self, connection):
         """在新线程中运行连接"""
-        loop = asyncio.new_event_loop()
+        loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        # JPEG解码在独立线程中执行（释放GIL），不阻塞事件循环；随事件循环关闭
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1, thread_name_prefix='JpegDecode'))
+        connection.loop = loop
         
         try:
-            loop.run_until_complete(self._connection_loop())
+            loop.run_until_complete(self._connection_loop(connection))
         except Exception as e:
             self.logger.error(f"WebSocket连接线程错误: {e}")
             self.error_occurred.emit(f"连接错误: {e}")
         finally:
+            connection.loop = None
             loop.close()
     
-    async def _connection_loop(self):
+    async def _connection_loop(self, connection):
         """连接循环"""
-        while self.is_running:
+        # 接收环形缓冲区（原始图像字节），接收协程只入队，解码任务取最新一帧
+        # 每个连接线程各自创建，asyncio.Event只在本线程的事件循环中使用
+        rx_ring = collections.deque(maxlen=8)
+        rx_event = asyncio.Event()
+        connection.wakeup = asyncio.Event()
+        decoder_task = asyncio.ensure_future(self._decode_frames(rx_ring, rx_event))
+        try:
+            await self._run_connection_attempts(connection, rx_ring, rx_event)
+        finally:
+            decoder_task.cancel()
+            try:
+                await decoder_task
+            except asyncio.CancelledError:
+                pass
+    
+    async def _run_connection_attempts(self, connection, rx_ring, rx_event):
+        """连接与重连（只由本线程的停止事件控制，不受之后新建的连接影响）"""
+        stop_event = connection.stop_event
+        while not stop_event.is_set():
             try:
                 current_url = self._get_current_url()
                 if not current_url:
@@ -146,10 +247,16 @@ class WebSocketManager(QObject):
                     current_url,
                     max_size=None,
                     max_queue=None,
+                    compression=None,    # 图像帧已是JPEG，不协商permessage-deflate，省去逐帧解压
                     ping_interval=None,  # 禁用ping
                     ping_timeout=None,   # 禁用ping超时
                     close_timeout=None   # 禁用关闭超时
                 ) as websocket:
+                    connection.websocket = websocket
+                    # 握手期间已调用disconnect()时_close_in_loop看不到该连接，这里直接退出
+                    if stop_event.is_set():
+                        break
+                    
                     self.websocket = websocket
                     self.is_connected_flag = True
                     self.reconnect_attempts = 0
@@ -158,23 +265,31 @@ class WebSocketManager(QObject):
                     self.connected.emit()
                     
                     # 监听消息
-                    await self._listen_for_messages()
+                    await self._listen_for_messages(websocket, stop_event, rx_ring, rx_event)
                     
             except websockets.exceptions.ConnectionClosed:
                 self.logger.info("WebSocket连接已关闭")
                 break
             except Exception as e:
+                if stop_event.is_set():
+                    break
                 self.logger.error(f"WebSocket连接错误: {e}")
                 self._handle_connection_error()
                 
             finally:
-                self.is_connected_flag = False
-                self.websocket = None
+                connection.websocket = None
+                if self._connection is connection:
+                    self.is_connected_flag = False
+                    self.websocket = None
                 
             # 如果需要重连 - 无延迟立即重连
-            if self.is_running and self._should_reconnect():
+            if not stop_event.is_set() and self._should_reconnect():
                 if self.reconnect_delay > 0:
-                    await asyncio.sleep(self.reconnect_delay)
+                    # 等待期间disconnect()会唤醒该事件，立即结束等待
+                    try:
+                        await asyncio.wait_for(connection.wakeup.wait(), self.reconnect_delay)
+                    except asyncio.TimeoutError:
+                        pass
                 # 否则立即重连，无延迟
             else:
                 break
@@ -197,28 +312,28 @@ class WebSocketManager(QObject):
     
     def _should_reconnect(self):
         """判断是否应该重连"""
-        return (self.is_running and 
-                self.reconnect_attempts < self.max_reconnect_attempts)
+        return self.reconnect_attempts < self.max_reconnect_attempts
     
-    async def _listen_for_messages(self):
+    async def _listen_for_messages(self, websocket, stop_event, rx_ring, rx_event):
         """监听消息"""
         try:
-            async for message in self.websocket:
-                if not self.is_running:
+            async for message in websocket:
+                if stop_event.is_set():
                     break
                     
+                # 二进制帧（websockets按操作码返回bytes），原始字节直接入队，由解码任务处理
+                # 同步入队不创建协程；已缓冲的消息recv()无需挂起即可返回
+                if type(message) is bytes:
+                    self._enqueue_frame(rx_ring, rx_event, message, "")
+                    continue
+                
+                # 文本帧，解析JSON
                 try:
-                    # 检查消息类型
-                    if isinstance(message, bytes):
-                        # 二进制消息，直接处理为图像数据
-                        await self._handle_binary_message(message)
-                    else:
-                        # 文本消息，尝试解析JSON
-                        data = json.loads(message)
-                        await self._handle_json_message(data)
+                    data = _json_loads(message)
+                    await self._handle_json_message(data, rx_ring, rx_event)
                 except json.JSONDecodeError:
-                    # 如果不是JSON，尝试作为二进制图像数据处理
-                    await self._handle_binary_message(message)
+                    # 非JSON文本消息不包含图像，忽略
+                    pass
                 except Exception as e:
                     self.logger.error(f"处理消息错误: {e}")
                     
@@ -227,75 +342,77 @@ class WebSocketManager(QObject):
         except Exception as e:
             self.logger.error(f"监听消息错误: {e}")
     
-    async def _handle_json_message(self, data):
+    async def _handle_json_message(self, data, rx_ring, rx_event):
         """处理JSON消息"""
         if 'image' in data:
             # 处理base64编码的图像
-            await self._decode_base64_image(data['image'])
+            await self._decode_base64_image(data['image'], rx_ring, rx_event)
         elif 'status' in data:
             self.status_updated.emit(data['status'])
     
-    async def _handle_binary_message(self, message):
-        """处理二进制消息"""
+    async def _decode_base64_image(self, base64_data, rx_ring, rx_event):
+        """解码base64图像数据"""
+        if not self._base64_warned:
+            self._base64_warned = True
+            self.logger.warning("设备正在以base64 JSON发送图像，建议改用二进制帧以减少带宽和解码开销")
+        
         try:
-            # 尝试将二进制数据解码为图像
-            if isinstance(message, bytes):
-                # 使用OpenCV解码图像
-                nparr = np.frombuffer(message, np.uint8)
-                image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if image is not None:
-                    # 验证图像数据的完整性
-                    try:
-                        # 简单验证：检查图像形状是否合理
-                        height, width = image.shape[:2]
-                        if height > 0 and width > 0 and height < 10000 and width < 10000:
-                            self.current_image = image
-                            self.image_count += 1
-                            self.last_image_time = time.time()
-                            self.image_received.emit(image)
-                        else:
-                            self.logger.warning(f"图像尺寸异常，跳过: {width}x{height}")
-                    except Exception as validation_error:
-                        self.logger.warning(f"图像验证失败，跳过损坏的图像: {validation_error}")
-                else:
-                    self.logger.warning("图像解码失败，可能是损坏的JPEG数据，跳过")
+            # 解码base64，图像字节交给解码任务
+            self._enqueue_frame(rx_ring, rx_event, base64.b64decode(base64_data), "base64")
         except Exception as e:
-            if "Corrupt JPEG data" in str(e) or "premature end of data segment" in str(e):
-                self.logger.warning("检测到损坏的JPEG数据，跳过此帧")
-            else:
-                self.logger.error(f"解码二进制图像错误: {e}")
+            self.logger.error(f"解码base64图像错误: {e}")
     
-    async def _decode_base64_image(self, base64_data):
-        """解码base64图像数据"""
-        try:
-            import base64
-            # 解码base64
-            image_data = base64.b64decode(base64_data)
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is not None:
-                # 验证图像数据的完整性
+    def _enqueue_frame(self, rx_ring, rx_event, data, source):
+        """将收到的图像字节放入环形缓冲区，满时自动丢弃最旧的帧"""
+        # JPEG以SOI(FFD8)开头；找不到结尾EOI(FFD9)说明帧被截断，不送解码器
+        # 只检查末尾少量字节（部分设备会在EOI后补零），非JPEG数据（如PNG）照常解码
+        if data[:2] == b'\xff\xd8' and data.rfind(b'\xff\xd9', -_JPEG_EOI_SEARCH_BYTES) < 0:
+            self.logger.warning("丢弃截断的%sJPEG帧 (%d 字节)", source, len(data))
+            return
+        
+        rx_ring.append((data, source))
+        rx_event.set()
+    
+    async def _decode_frames(self, rx_ring, rx_event):
+        """
+        解码任务：接收与解码解耦，解码跟不上时只解码最新一帧，
+        积压的旧帧直接丢弃
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await rx_event.wait()
+            rx_event.clear()
+            while rx_ring:
+                data, source = rx_ring.pop()
+                rx_ring.clear()
                 try:
-                    # 简单验证：检查图像形状是否合理
-                    height, width = image.shape[:2]
-                    if height > 0 and width > 0 and height < 10000 and width < 10000:
-                        self.current_image = image
-                        self.image_count += 1
-                        self.last_image_time = time.time()
-                        self.image_received.emit(image)
+                    image = await loop.run_in_executor(None, _decode_jpeg_bytes, data)
+                    self._publish_image(image, source)
+                except Exception as e:
+                    if "Corrupt JPEG data" in str(e) or "premature end of data segment" in str(e):
+                        self.logger.warning(f"检测到损坏的{source} JPEG数据，跳过此帧")
                     else:
-                        self.logger.warning(f"base64图像尺寸异常，跳过: {width}x{height}")
-                except Exception as validation_error:
-                    self.logger.warning(f"base64图像验证失败，跳过损坏的图像: {validation_error}")
-            else:
-                self.logger.warning("base64图像解码失败，可能是损坏的JPEG数据，跳过")
-        except Exception as e:
-            if "Corrupt JPEG data" in str(e) or "premature end of data segment" in str(e):
-                self.logger.warning("检测到损坏的base64 JPEG数据，跳过此帧")
+                        self.logger.error(f"解码{source or '二进制'}图像错误: {e}")
+    
+    def _publish_image(self, image, source):
+        """验证解码后的图像并发送"""
+        if image is None:
+            self.logger.warning(f"{source}图像解码失败，可能是损坏的JPEG数据，跳过")
+            return
+        
+        # 验证图像数据的完整性
+        try:
+            # 简单验证：检查图像形状是否合理
+            height, width = image.shape[:2]
+            if height > 0 and width > 0 and height < 10000 and width < 10000:
+                self.current_image = image
+                self.image_count += 1
+                self.last_image_time = time.time()
+                self.image_received.emit(image)
             else:
-                self.logger.error(f"解码base64图像错误: {e}")
+                self.logger.warning(f"{source}图像尺寸异常，跳过: {width}x{height}")
+        except Exception as validation_error:
+            self.logger.warning(f"{source}图像验证失败，跳过损坏的图像: {validation_error}")
     
     def get_connection_stats(self):
         """获取连接统计信息"""
@@ -3,20 +3,31 @@ UI组件包
 包含所有用户界面相关的组件
 """
 
-from .components import ROISelector, ModernButton
-from .dialogs import UserInfoDialog
-from .voice_guide import VoiceGuide
-from .enhanced_panels import RotationPanel, ROIPanel
-from .main_window import BaseRecorderWindow
-from .enhanced_recorder import EnhancedRecorderWindow
+import importlib
 
-__all__ = [
-    'ROISelector',
-    'ModernButton',
-    'UserInfoDialog', 
-    'VoiceGuide',
-    'RotationPanel',
-    'ROIPanel',
-    'BaseRecorderWindow',
-    'EnhancedRecorderWindow'
-]
+# 按需导入，只加载实际用到的界面模块
+_lazy_imports = {
+    'ROISelector': '.components',
+    'ModernButton': '.components',
+    'UserInfoDialog': '.dialogs',
+    'VoiceGuide': '.voice_guide',
+    'RotationPanel': '.enhanced_panels',
+    'ROIPanel': '.enhanced_panels',
+    'BaseRecorderWindow': '.main_window',
+    'EnhancedRecorderWindow': '.enhanced_recorder',
+}
+
+__all__ = list(_lazy_imports)
+
+
+def __getattr__(name):
+    module_path = _lazy_imports.get(name)
+    if module_path is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_path, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
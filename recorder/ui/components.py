@@ -3,10 +3,9 @@ UI组件模块
 包含ROI选择器、按钮等组件
 """
 
-import time
 from PyQt5.QtWidgets import QLabel, QPushButton
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QRect, QPoint
-from PyQt5.QtGui import QPixmap, QImage, QFont, QPalette, QColor, QPainter, QPen, QBrush
+from PyQt5.QtCore import Qt, QTimer, QEvent, pyqtSignal, QRect, QPoint
+from PyQt5.QtGui import QPainter, QPen, QStaticText, QFontMetrics
 
 
 class ROISelector(QLabel):
@@ -31,11 +30,30 @@ class ROISelector(QLabel):
         self.image_rect = None  # 实际图像在预览中的矩形区域
         self.original_image_size = None  # 原始图像尺寸 (width, height)
         self.scale_factor = 1.0  # 缩放因子
+        
+        # 绘制用的画笔和ROI文字只创建一次，拖动选择时每次重绘不再重新构造
+        self._pen_selecting = QPen(Qt.red, 2, Qt.DashLine)
+        self._pen_roi = QPen(Qt.green, 3, Qt.SolidLine)
+        self._roi_label = QStaticText()  # 文字排版结果由Qt缓存，重绘时直接绘制
+        self._roi_label_pos = QPoint()
+        self._preview_roi_rect = None  # 已确认ROI在预览中的矩形，ROI或缩放变化时重新计算
+        self._font_ascent = QFontMetrics(self.font()).ascent()  # 字体变化时更新
+        
+        # 拖动选择时合并重绘请求，最多约60Hz（高回报率鼠标每秒可产生数百次移动事件）
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.timeout.connect(self._flush_selection_update)
+        # 拖动时只重绘选择框变化的区域（上一帧与当前选择框的并集）
+        self._last_selection_rect = QRect()
+        self._dirty_rect = QRect()
     
     def setPixmap(self, pixmap):
         """重写setPixmap，计算图像在预览中的实际位置和缩放因子"""
         super().setPixmap(pixmap)
         
+        # 预览帧尺寸通常不变，图像区域和缩放因子都没变时无需重新计算ROI的预览矩形
+        old_image_rect, old_scale_factor = self.image_rect, self.scale_factor
+        
         if pixmap and not pixmap.isNull():
             # 计算图像在标签中的实际显示区域
             label_size = self.size()
@@ -56,6 +74,37 @@ class ROISelector(QLabel):
                     pixmap_size.width() / original_width,
                     pixmap_size.height() / original_height
                 )
+        
+        if self.image_rect != old_image_rect or self.scale_factor != old_scale_factor:
+            self._recompute_preview_roi_rect()
+    
+    def changeEvent(self, event):
+        """字体变化时更新缓存的字体上升高度和ROI文字位置"""
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self._font_ascent = QFontMetrics(self.font()).ascent()
+            self._recompute_preview_roi_rect()
+    
+    def _recompute_preview_roi_rect(self):
+        """将已确认的ROI（原始图像坐标）转换为预览坐标并缓存"""
+        if not self.roi_rect or not self.image_rect or self.scale_factor <= 0:
+            self._preview_roi_rect = None
+            return
+        
+        # 原始图像坐标
+        orig_x, orig_y, orig_w, orig_h = self.roi_rect
+        
+        # 转换为预览坐标
+        self._preview_roi_rect = QRect(
+            int(orig_x * self.scale_factor) + self.image_rect.x(),
+            int(orig_y * self.scale_factor) + self.image_rect.y(),
+            int(orig_w * self.scale_factor),
+            int(orig_h * self.scale_factor)
+        )
+        
+        # 文字基线在矩形上方5像素，QStaticText按左上角定位
+        self._roi_label_pos = QPoint(self._preview_roi_rect.x(),
+                                     self._preview_roi_rect.y() - 5 - self._font_ascent)
     
     def mousePressEvent(self, event):
         """鼠标按下事件 - 检查是否在有效图像区域内"""
@@ -68,7 +117,12 @@ class ROISelector(QLabel):
                 relative_x = click_pos.x() - self.image_rect.x()
                 relative_y = click_pos.y() - self.image_rect.y()
                 self.start_point = QPoint(relative_x, relative_y)
+                self.end_point = None
                 self.is_selecting = True
+                
+                # 开始选择时已确认的ROI不再绘制，整体重绘一次
+                self._last_selection_rect = QRect()
+                self.update()
     
     def mouseMoveEvent(self, event):
         """鼠标移动事件 - 限制在有效图像区域内"""
@@ -86,7 +140,27 @@ class ROISelector(QLabel):
             relative_y = constrained_y - self.image_rect.y()
             
             self.end_point = QPoint(relative_x, relative_y)
-            self.update()
+            
+            # 记录需要重绘的区域（外扩以覆盖画笔宽度）
+            selection_rect = self._selection_rect().adjusted(-2, -2, 2, 2)
+            self._dirty_rect = self._dirty_rect.united(self._last_selection_rect).united(selection_rect)
+            self._last_selection_rect = selection_rect
+            if not self._update_timer.isActive():
+                self._update_timer.start(16)
+    
+    def _selection_rect(self):
+        """正在拖动的选择框（预览坐标）"""
+        x1 = self.start_point.x() + self.image_rect.x()
+        y1 = self.start_point.y() + self.image_rect.y()
+        x2 = self.end_point.x() + self.image_rect.x()
+        y2 = self.end_point.y() + self.image_rect.y()
+        return QRect(min(x1, x2), min(y1, y2), abs(x2-x1), abs(y2-y1))
+    
+    def _flush_selection_update(self):
+        """重绘累积的选择框区域"""
+        if not self._dirty_rect.isNull():
+            self.update(self._dirty_rect)
+            self._dirty_rect = QRect()
     
     def mouseReleaseEvent(self, event):
         """鼠标释放事件 - 计算最终ROI（转换为原始图像坐标）"""
@@ -121,6 +195,8 @@ class ROISelector(QLabel):
                         
                         # 存储原始图像坐标
                         self.roi_rect = (original_x, original_y, original_w, original_h)
+                        self._roi_label.setText(f"ROI: {original_w}×{original_h} (原始)")
+                        self._recompute_preview_roi_rect()
                         
                         # 发送原始图像坐标
                         self.roi_selected.emit(self.roi_rect)
@@ -141,38 +217,16 @@ class ROISelector(QLabel):
         
         # 绘制ROI选择框（转换回预览坐标）
         if self.is_selecting and self.start_point and self.end_point:
-            pen = QPen(Qt.red, 2, Qt.DashLine)
-            painter.setPen(pen)
-            
-            # 转换为预览坐标
-            x1 = self.start_point.x() + self.image_rect.x()
-            y1 = self.start_point.y() + self.image_rect.y()
-            x2 = self.end_point.x() + self.image_rect.x()
-            y2 = self.end_point.y() + self.image_rect.y()
-            
-            rect = QRect(min(x1, x2), min(y1, y2), abs(x2-x1), abs(y2-y1))
-            painter.drawRect(rect)
+            painter.setPen(self._pen_selecting)
+            painter.drawRect(self._selection_rect())
         
         # 绘制已确认的ROI（从原始坐标转换为预览坐标）
-        elif self.roi_rect and self.scale_factor > 0:
-            pen = QPen(Qt.green, 3, Qt.SolidLine)
-            painter.setPen(pen)
-            
-            # 原始图像坐标
-            orig_x, orig_y, orig_w, orig_h = self.roi_rect
-            
-            # 转换为预览坐标
-            preview_x = int(orig_x * self.scale_factor) + self.image_rect.x()
-            preview_y = int(orig_y * self.scale_factor) + self.image_rect.y()
-            preview_w = int(orig_w * self.scale_factor)
-            preview_h = int(orig_h * self.scale_factor)
-            
-            rect = QRect(preview_x, preview_y, preview_w, preview_h)
-            painter.drawRect(rect)
+        elif self._preview_roi_rect is not None:
+            painter.setPen(self._pen_roi)
+            painter.drawRect(self._preview_roi_rect)
             
-            # 添加ROI信息文字（显示原始图像尺寸）
-            painter.setPen(QPen(Qt.green, 1))
-            painter.drawText(preview_x, preview_y-5, f"ROI: {orig_w}×{orig_h} (原始)")
+            # 添加ROI信息文字（显示原始图像尺寸）；文字只使用画笔颜色，沿用同一支画笔
+            painter.drawStaticText(self._roi_label_pos, self._roi_label)
     
     def get_roi_rect(self):
         """获取ROI矩形"""
@@ -180,47 +234,39 @@ class ROISelector(QLabel):
     
     def clear_roi(self):
         """清除ROI选择"""
+        had_roi = self.roi_rect is not None
         self.roi_rect = None
+        self._preview_roi_rect = None
         self.start_point = None
         self.end_point = None
-        self.roi_cleared.emit()  # 发送清除信号
+        # 只在确实清除了ROI时发送信号（ROIPanel的清除槽会再次调用clear_roi，避免无限递归）
+        if had_roi:
+            self.roi_cleared.emit()
         self.update()
 
 
-class ModernButton(QPushButton):
-    """
-现代化按钮组件
-提供不同风格的按钮样式
-"""
-    
-    def __init__(self, text="", button_type="primary", parent=None):
-        super().__init__(text, parent)
-        self.button_type = button_type
-        self.setup_style()
-        
-    def setup_style(self):
-        """设置按钮样式"""
-        styles = {
-            "primary": {
-                "bg": "#28a745",
-                "hover": "#218838",
-                "text": "white"
-            },
-            "danger": {
-                "bg": "#dc3545", 
-                "hover": "#c82333",
-                "text": "white"
-            },
-            "secondary": {
-                "bg": "#6c757d",
-                "hover": "#5a6268", 
-                "text": "white"
-            }
-        }
-        
-        style = styles.get(self.button_type, styles["primary"])
-        
-        self.setStyleSheet(f"""
+# 按钮配色
+_BUTTON_COLORS = {
+    "primary": {
+        "bg": "#28a745",
+        "hover": "#218838",
+        "text": "white"
+    },
+    "danger": {
+        "bg": "#dc3545", 
+        "hover": "#c82333",
+        "text": "white"
+    },
+    "secondary": {
+        "bg": "#6c757d",
+        "hover": "#5a6268", 
+        "text": "white"
+    }
+}
+
+# 各类型按钮的样式表，导入时生成一次，所有按钮实例共享
+_BUTTON_STYLES = {
+    button_type: f"""
             QPushButton {{
                 background-color: {style["bg"]};
                 color: {style["text"]};
@@ -242,4 +288,22 @@ class ModernButton(QPushButton):
                 background-color: #e9ecef;
                 color: #6c757d;
             }}
-        """)
+        """
+    for button_type, style in _BUTTON_COLORS.items()
+}
+
+
+class ModernButton(QPushButton):
+    """
+现代化按钮组件
+提供不同风格的按钮样式
+"""
+    
+    def __init__(self, text="", button_type="primary", parent=None):
+        super().__init__(text, parent)
+        self.button_type = button_type
+        self.setup_style()
+        
+    def setup_style(self):
+        """设置按钮样式"""
+        self.setStyleSheet(_BUTTON_STYLES.get(self.button_type, _BUTTON_STYLES["primary"]))
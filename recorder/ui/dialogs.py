@@ -4,12 +4,16 @@
 """
 
 import os
+import re
 from PyQt5.QtWidgets import (
     QLabel, QPushButton, QLineEdit, QDialog, QVBoxLayout,
     QDialogButtonBox, QMessageBox
 )
 from PyQt5.QtCore import Qt
 
+# 邮箱格式校验（模块级预编译）
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
 
 class UserInfoDialog(QDialog):
     """用户信息设置对话框"""
@@ -131,4 +135,7 @@ class UserInfoDialog(QDialog):
         if not user_info['email']:
             QMessageBox.warning(self, "⚠️ 提示", "请输入邮箱地址！")
             return
+        if not _EMAIL_RE.match(user_info['email']):
+            QMessageBox.warning(self, "⚠️ 提示", "请输入有效的邮箱地址！")
+            return
         super().accept()
@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QCheckBox, QGroupBox, QSlider, QSpinBox, QMessageBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSignalBlocker
 from .components import ROISelector
 
 
@@ -60,10 +60,12 @@ class RotationPanel(QGroupBox):
             ("↕ 180°", 180)
         ]
         
+        button_style = self._get_button_style()
         for text, angle in quick_buttons:
             btn = QPushButton(text)
-            btn.setStyleSheet(self._get_button_style())
-            btn.clicked.connect(lambda checked, a=angle: self.set_rotation_angle(a))
+            btn.setStyleSheet(button_style)
+            btn.setProperty("angle", angle)
+            btn.clicked.connect(self._on_quick_angle)
             quick_buttons_layout.addWidget(btn)
         
         layout.addLayout(quick_buttons_layout)
@@ -74,21 +76,29 @@ class RotationPanel(QGroupBox):
         self.rotation_slider.valueChanged.connect(self.on_rotation_changed)
         self.angle_spinbox.valueChanged.connect(self.on_angle_spinbox_changed)
     
+    def _on_quick_angle(self):
+        """快速旋转按钮点击（角度存放在按钮的angle属性中）"""
+        self.set_rotation_angle(self.sender().property("angle"))
+    
     def set_rotation_angle(self, angle):
         """设置旋转角度"""
         self.rotation_angle = angle
-        self.rotation_slider.setValue(angle)
-        self.angle_spinbox.setValue(angle)
+        # 同步两个控件时屏蔽信号，避免互相触发
+        with QSignalBlocker(self.rotation_slider), QSignalBlocker(self.angle_spinbox):
+            self.rotation_slider.setValue(angle)
+            self.angle_spinbox.setValue(angle)
     
     def on_rotation_changed(self, value):
         """旋转滑块变化"""
         self.rotation_angle = value
-        self.angle_spinbox.setValue(value)
+        with QSignalBlocker(self.angle_spinbox):
+            self.angle_spinbox.setValue(value)
     
     def on_angle_spinbox_changed(self, value):
         """角度输入框变化"""
         self.rotation_angle = value
-        self.rotation_slider.setValue(value)
+        with QSignalBlocker(self.rotation_slider):
+            self.rotation_slider.setValue(value)
     
     def get_rotation_angle(self):
         """获取当前旋转角度"""
@@ -228,6 +238,10 @@ class ROIPanel(QGroupBox):
                 border-radius: 6px;
                 border: 1px solid #e9ecef;
             }
+            QLabel[hint="true"] {
+                color: #17a2b8;
+                font-weight: 600;
+            }
         """)
         layout.addWidget(self.roi_info_label)
         
@@ -267,25 +281,36 @@ ROI启用状态变化"""
         """启用ROI选择"""
         if self.preview_label and hasattr(self.preview_label, 'clear_roi'):
             self.preview_label.clear_roi()
-        QMessageBox.information(self, "ℹ️ 提示", "请在预览区域拖拽选择ROI区域")
+        # 在面板内提示，不弹出模态对话框
+        self._set_roi_info("请在预览区域拖拽选择ROI区域", hint=True)
+    
+    def _set_roi_info(self, text, hint=False):
+        """更新ROI信息标签，hint为True时以提示样式显示"""
+        self.roi_info_label.setText(text)
+        if self.roi_info_label.property("hint") != hint:
+            self.roi_info_label.setProperty("hint", hint)
+            # 动态属性变化后需要重新应用样式
+            self.roi_info_label.style().unpolish(self.roi_info_label)
+            self.roi_info_label.style().polish(self.roi_info_label)
     
     def clear_roi_selection(self):
         """清除ROI选择"""
         self.roi_coords = None
         if self.preview_label and hasattr(self.preview_label, 'clear_roi'):
             self.preview_label.clear_roi()
-        self.roi_info_label.setText("未选择ROI区域")
+        self._set_roi_info("未选择ROI区域")
         self.roi_clear_btn.setEnabled(False)
         self.preview_roi_btn.setEnabled(False)  # 禁用预览按钮
     
     def update_roi_info(self, roi_rect):
         """更新ROI信息 - 添加坐标验证"""
         if roi_rect:
-            self.roi_coords = roi_rect
             x, y, w, h = roi_rect
             
-            # 显示预览坐标
-            self.roi_info_label.setText(f"ROI: {w}×{h} (预览坐标: {x},{y})")
+            # 显示预览坐标（ROI未变化时无需重新格式化文字）
+            if roi_rect != self.roi_coords:
+                self.roi_coords = roi_rect
+                self._set_roi_info(f"ROI: {w}×{h} (预览坐标: {x},{y})")
             self.roi_clear_btn.setEnabled(True)
             self.preview_roi_btn.setEnabled(True)  # 启用预览按钮
             
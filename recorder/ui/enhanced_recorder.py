@@ -31,6 +31,7 @@ class EnhancedRecorderWindow(BaseRecorderWindow):
         self.roi_enabled = False
         self.roi_coords = None
         self._roi_panel = None
+        self._preview_rotation_buffer = None  # 预览旋转输出缓冲区，每帧复用
         
         super().__init__()
         
@@ -413,6 +414,10 @@ class EnhancedRecorderWindow(BaseRecorderWindow):
     # 事件处理方法
     def connect_device(self):
         """连接设备"""
+        # 网络管理器在_late_init中创建，此前忽略操作
+        if self.websocket_manager is None:
+            return
+        
         ip_address = self.websocket_url.text().strip()
         if not ip_address:
             QMessageBox.warning(self, "⚠️ 警告", "请输入设备IP地址！")
@@ -448,6 +453,10 @@ class EnhancedRecorderWindow(BaseRecorderWindow):
     
     def disconnect_device(self):
         """断开设备连接"""
+        # 网络管理器在_late_init中创建，此前忽略操作
+        if self.websocket_manager is None:
+            return
+        
         self.websocket_manager.disconnect()
         self.connect_btn.setEnabled(True)
         self.disconnect_btn.setEnabled(False)
@@ -463,6 +472,10 @@ class EnhancedRecorderWindow(BaseRecorderWindow):
     
     def start_multi_stage_recording(self):
         """开始多阶段录制"""
+        # 网络管理器在_late_init中创建，此前忽略操作
+        if self.websocket_manager is None:
+            return
+        
         success = self.multistage_manager.start_multi_stage_recording(
             self.user_info,
             self.save_path.text(),
@@ -543,28 +556,38 @@ class EnhancedRecorderWindow(BaseRecorderWindow):
                 # 获取当前处理参数
                 processing_params = self.get_processing_params()
                 
-                # 应用旋转到预览图像
-                preview_image = self.current_image.copy()
-                if processing_params['rotation_angle'] != 0:
+                # 获取预览区域尺寸
+                preview_size = self.preview_label.size()
+                
+                # 应用旋转到预览图像（旋转结果写入复用缓冲区，原图不会被修改，无需复制）
+                preview_image = self.current_image
+                rotation_angle = processing_params['rotation_angle']
+                if rotation_angle != 0:
+                    # 旋转后的完整尺寸（ROI坐标和缩放因子都基于该尺寸）
+                    _, width, height = ImageProcessor.get_rotation_matrix(width, height, rotation_angle)
+                    
+                    # 直接旋转到显示尺寸，不生成超出缓存的整张大画布再由Qt缩小
+                    fit_scale = min(preview_size.width() / width, preview_size.height() / height, 1.0)
                     preview_image = ImageProcessor.rotate_image(
                         preview_image, 
-                        processing_params['rotation_angle']
+                        rotation_angle,
+                        dst=self._preview_rotation_buffer,
+                        scale=fit_scale
                     )
+                    self._preview_rotation_buffer = preview_image
                 
-                # 转换为Qt格式
-                height, width, channel = preview_image.shape
-                bytes_per_line = 3 * width
-                q_image = QImage(preview_image.data, width, height, 
-                               bytes_per_line, QImage.Format_RGB888).rgbSwapped()
+                # 转换为Qt格式 - 直接包装BGR数据，不做rgbSwapped整帧复制
+                # （QPixmap.fromImage会复制数据，之后不再引用该缓冲区）
+                image_height, image_width = preview_image.shape[:2]
+                bytes_per_line = preview_image.strides[0]
+                q_image = QImage(preview_image.data, image_width, image_height, 
+                               bytes_per_line, QImage.Format_BGR888)
                 
                 # 验证QImage是否有效
                 if q_image.isNull():
                     self.logger.warning("QImage转换失败，跳过预览更新")
                     return
                 
-                # 获取预览区域尺寸
-                preview_size = self.preview_label.size()
-                
                 # 保持宽高比缩放（关键：不填满，保持比例）
                 scaled_pixmap = QPixmap.fromImage(q_image).scaled(
                     preview_size, 
@@ -8,13 +8,9 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QSplitter, QStatusBar, QMessageBox
 )
-from PyQt5.QtCore import Qt, QTimer, QSettings
-from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import Qt, QTimer
 
 from ..config.settings import AppSettings, AppConstants
-from ..network.websocket_manager import WebSocketManager
-from ..core.image_processor import ImageProcessor
-from ..core.recording_session import RecordingSession
 from ..core.multistage_manager import MultiStageManager
 from .components import ROISelector
 from .dialogs import UserInfoDialog
@@ -35,8 +31,24 @@ class BaseRecorderWindow(QMainWindow):
         self.setup_connections()
         self.load_settings()
         
+        # 网络模块（websockets/asyncio）在窗口显示后再加载
+        QTimer.singleShot(0, self._late_init)
+        
         self.logger.info("PaperTracker 图像录制工具启动完成")
     
+    def _late_init(self):
+        """窗口显示后的延迟初始化"""
+        from ..network.websocket_manager import WebSocketManager
+        
+        self.websocket_manager = WebSocketManager()
+        
+        # WebSocket连接信号
+        self.websocket_manager.connected.connect(self.on_websocket_connected)
+        self.websocket_manager.disconnected.connect(self.on_websocket_disconnected)
+        self.websocket_manager.error_occurred.connect(self.on_websocket_error)
+        self.websocket_manager.image_received.connect(self.on_image_received)
+        self.websocket_manager.status_updated.connect(self.on_status_updated)
+    
     def setup_logging(self):
         """设置日志"""
         logging.basicConfig(
@@ -50,8 +62,8 @@ class BaseRecorderWindow(QMainWindow):
         # 应用设置
         self.app_settings = AppSettings()
         
-        # 网络管理
-        self.websocket_manager = WebSocketManager()
+        # 网络管理（在_late_init中创建）
+        self.websocket_manager = None
         
         # 录制管理
         self.recording_session = None
@@ -212,13 +224,6 @@ class BaseRecorderWindow(QMainWindow):
     
     def setup_connections(self):
         """设置信号连接"""
-        # WebSocket连接信号
-        self.websocket_manager.connected.connect(self.on_websocket_connected)
-        self.websocket_manager.disconnected.connect(self.on_websocket_disconnected)
-        self.websocket_manager.error_occurred.connect(self.on_websocket_error)
-        self.websocket_manager.image_received.connect(self.on_image_received)
-        self.websocket_manager.status_updated.connect(self.on_status_updated)
-        
         # 多阶段录制信号
         self.multistage_manager.stage_started.connect(self.on_stage_started)
         self.multistage_manager.stage_completed.connect(self.on_stage_completed)
@@ -241,12 +246,14 @@ class BaseRecorderWindow(QMainWindow):
             self.saveGeometry(),
             self.saveState()
         )
+        self.app_settings.sync()
     
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.save_settings()
-        self.websocket_manager.disconnect()
-        self.multistage_manager.stop_multi_stage_recording()
+        if self.websocket_manager:
+            self.websocket_manager.disconnect()
+        self.multistage_manager.shutdown()
         event.accept()
     
     # 事件处理方法（子类可以重写）
@@ -294,7 +301,7 @@ WebSocket错误"""
         
         # 收到图就立即录制 - 如果正在进行多阶段录制，自动保存图像
         if self.multistage_manager.is_active():
-            self.multistage_manager.capture_current_image()
+            self.multistage_manager.capture_current_image(image)
     
     def on_status_updated(self, status):
         """状态更新"""